@@ -2,15 +2,45 @@ from __future__ import annotations
 import sympy as sp
 
 
+# INFO: SymPy caches keep function classes alive anyway, at most one entry per prefix and bond index
+_bond_functions: dict[tuple[str,int],sp.Function] = {}
+
+
+def _make_bond_function(prefix: str, index: int) -> sp.Function:
+    func: sp.Function|None = _bond_functions.get((prefix, index))
+    if func is None:
+        func = sp.Function(prefix + "_{" + str(index) + "}", real=True)
+        _bond_functions[(prefix, index)] = func
+    return func
+
+
 class Bond():
+    __slots__ = (
+        "__start",
+        "__end",
+        "__edge",
+        "__index",
+        "__effort",
+        "__flow",
+        "__displacement",
+        "__momentum",
+        "__applied",
+        "__effort_causality_direction",
+        "__flow_causality_direction",
+    )
+
     def __init__(self, start: str, end: str, index: int, time_var: sp.Symbol):
         self.__start: str = start
         self.__end: str = end
+        self.__edge: tuple[str,str] = (start, end)
         self.__index: int = index
-        self.__effort = sp.Function("e_{" + str(index) + "}", real=True)
-        self.__flow = sp.Function("f_{" + str(index) + "}", real=True)
-        self.__displacement = sp.Function("q_{" + str(index) + "}", real=True)
-        self.__momentum = sp.Function("p_{" + str(index) + "}", real=True)
+        # Functions are created on first access, most bonds never need displacement or momentum
+        self.__effort: sp.Function|None = None
+        self.__flow: sp.Function|None = None
+        self.__displacement: sp.Function|None = None
+        self.__momentum: sp.Function|None = None
+        # Applications to a time variable, equation building asks for the same ones repeatedly
+        self.__applied: dict[tuple[str,sp.Symbol],sp.Expr] = {}
         self.__effort_causality_direction: tuple[str,str]|None = None
         self.__flow_causality_direction: tuple[str,str]|None = None
 
@@ -20,7 +50,9 @@ class Bond():
     def is_causality_set(self) -> bool:
         return self.__effort_causality_direction != None and self.__flow_causality_direction != None
 
-    def set_effort_causality_direction_towards(self, el_name: str):
+    def set_effort_causality_direction_towards(self, el_name: str) -> bool:
+        if self.__effort_causality_direction == (self.get_other_end(el_name), el_name):
+            return False
         if self.__effort_causality_direction:
             if self.__effort_causality_direction[1] != el_name:
                 raise Exception("Causal conflict: causality already set for bond", str(self))
@@ -35,8 +67,11 @@ class Bond():
             self.__flow_causality_direction = (el_name, self.__start)
         else:
             raise Exception("Unknown element name in bond", self)
+        return True
 
-    def set_effort_causality_direction_from(self, el_name: str):
+    def set_effort_causality_direction_from(self, el_name: str) -> bool:
+        if self.__effort_causality_direction == (el_name, self.get_other_end(el_name)):
+            return False
         if self.__effort_causality_direction:
             if self.__effort_causality_direction[0] != el_name:
                 raise Exception("Causal conflict: effort causality already set for bond", str(self))
@@ -51,12 +86,13 @@ class Bond():
             raise Exception("Unknown element name in bond", self)
         self.__effort_causality_direction = (el_name, other)
         self.__flow_causality_direction = (other, el_name)
+        return True
 
-    def set_flow_causality_direction_towards(self, el_name: str):
-        self.set_effort_causality_direction_from(el_name)
+    def set_flow_causality_direction_towards(self, el_name: str) -> bool:
+        return self.set_effort_causality_direction_from(el_name)
 
-    def set_flow_causality_direction_from(self, el_name: str):
-        self.set_effort_causality_direction_towards(el_name)
+    def set_flow_causality_direction_from(self, el_name: str) -> bool:
+        return self.set_effort_causality_direction_towards(el_name)
 
     def __check_causality(self):
         if self.__effort_causality_direction == None:
@@ -78,30 +114,55 @@ class Bond():
     def get_end(self) -> str:
         return self.__end
 
+    def get_edge(self) -> tuple[str,str]:
+        return self.__edge
+
+    def get_other_end(self, el_name: str) -> str|None:
+        if self.__start == el_name:
+            return self.__end
+        elif self.__end == el_name:
+            return self.__start
+        return None
+
     def get_index(self) -> int:
         return self.__index
 
+    def __apply(self, prefix: str, func: sp.Function, time_var: sp.Symbol) -> sp.Expr:
+        applied: sp.Expr|None = self.__applied.get((prefix, time_var))
+        if applied is None:
+            applied = func(time_var)
+            self.__applied[(prefix, time_var)] = applied
+        return applied
+
     def get_effort(self, time_var: sp.Symbol|None = None) -> sp.Function:
+        if self.__effort is None:
+            self.__effort = _make_bond_function("e", self.__index)
         if time_var == None:
             return self.__effort
         else:
-            return self.__effort(time_var)
+            return self.__apply("e", self.__effort, time_var)
 
     def get_flow(self, time_var: sp.Symbol|None = None) -> sp.Function:
+        if self.__flow is None:
+            self.__flow = _make_bond_function("f", self.__index)
         if time_var == None:
             return self.__flow
         else:
-            return self.__flow(time_var)
+            return self.__apply("f", self.__flow, time_var)
 
     def get_displacement(self, time_var: sp.Symbol|None = None) -> sp.Function:
+        if self.__displacement is None:
+            self.__displacement = _make_bond_function("q", self.__index)
         if time_var == None:
             return self.__displacement
         else:
-            return self.__displacement(time_var)
+            return self.__apply("q", self.__displacement, time_var)
 
     def get_momentum(self, time_var: sp.Symbol|None = None) -> sp.Function:
+        if self.__momentum is None:
+            self.__momentum = _make_bond_function("p", self.__index)
         if time_var == None:
             return self.__momentum
         else:
-            return self.__momentum(time_var)
+            return self.__apply("p", self.__momentum, time_var)
 
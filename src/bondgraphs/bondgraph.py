@@ -1,4 +1,11 @@
 from __future__ import annotations
+from typing import Callable
+import numpy as np
+try:
+    import numba
+except ImportError:
+    numba = None
+
 from .element import *
 from .bond import *
 from .causalbg import CausalBondgraph
@@ -11,21 +18,50 @@ class DirectedBondgraph(BondgraphViewer, CausalBondgraph):
     Directions of bonds determine what the positive flow of energy (power) is.
     Assume empty energy stores and energy flow from sources through junction structure into energy stores, dissipators and sinks.
     """
-
-    def __init__(self, name: str, elements: list[Element] = [], bonds: list[tuple[str,str]] = []):
+    def __init__(
+        self,
+        name: str,
+        elements: list[Element] = [],
+        bonds: list[tuple[str,str]] = [],
+        verbose: bool = False,
+    ):
         self.__name: str = name
         self.__time_var: sp.Symbol = sp.Symbol("t", real=True, nonnegative=True)
         self.__tau: sp.Symbol = sp.Symbol("tau", real=True, nonnegative=True)
         self.__elements: dict[str, Element] = {}
+        # Bond graph is not changed after construction, so equations and solutions are computed once
+        self.__equations: list[BondgraphEquation]|None = None
+        self.__solutions: list[dict]|None = None
+        self.__solution_log: list[str] = []
+        # Compiled solutions, keyed by solution number and simulated variables
+        self.__compiled_solutions: dict[tuple[int,tuple],Callable] = {}
+        # Causality assignment is expensive, so it is deferred until bonds or equations are needed
+        self.__causalities_assigned: bool = False
+        self.__causality_error: Exception|None = None
         for e in elements:
             self.__add_element(e)
         self.__add_bonds(bonds)
+        self.__bonds: list[Bond] = [
+            bond for ekey in self.__elements for bond in self.__elements[ekey].get_in_bonds()
+        ]
         for ekey in self.__elements:
             self.__elements[ekey].check_bonds()
-        self._assign_causalities()
-        self.show_bond_causalities()
-        self.show_bonds()
-        self.show_elements()
+        if verbose:
+            self.show_bond_causalities()
+            self.show_bonds()
+            self.show_elements()
+
+    def _ensure_causalities(self):
+        if self.__causality_error != None:
+            # INFO: Bonds are left partially assigned after a conflict, so assignment is not retried
+            raise self.__causality_error
+        if not self.__causalities_assigned:
+            try:
+                self._assign_causalities()
+            except Exception as exc:
+                self.__causality_error = exc
+                raise
+            self.__causalities_assigned = True
 
     def __add_element(self, element: Element):
         identifier: str = element.get_identifier()
@@ -34,9 +70,11 @@ class DirectedBondgraph(BondgraphViewer, CausalBondgraph):
         self.__elements[identifier] = element
 
     def __add_bonds(self, bonds: list[tuple[str,str]]):
-        if len(bonds) != len(set(bonds)):
-            raise Exception("Duplicate bonds defined.")
+        seen: set[tuple[str,str]] = set()
         for idx, (start_id, end_id) in enumerate(bonds):
+            if (start_id, end_id) in seen:
+                raise Exception("Duplicate bond (" + start_id + "," + end_id + ") defined in bond graph " + self.__name + ".")
+            seen.add((start_id, end_id))
             if start_id not in self.__elements:
                 raise Exception(start_id + " not in elements of bond graph " + self.__name + ".")
             if end_id not in self.__elements:
@@ -51,12 +89,13 @@ class DirectedBondgraph(BondgraphViewer, CausalBondgraph):
     def get_node_ids(self) -> list[str]:
         return list(self.__elements.keys())
 
+    def _get_raw_bonds(self) -> list[Bond]:
+        return self.__bonds
+
     def get_bonds(self) -> list[Bond]:
-        bonds: list[Bond] = []
-        for ekey in self.__elements:
-            element: Element = self.__elements[ekey]
-            bonds = bonds + element.get_in_bonds()
-        return bonds
+        self._ensure_causalities()
+        # Copy, so callers cannot change the bonds the causality assignment is based on
+        return list(self.__bonds)
 
     def get_elements(self) -> dict[str,Element]:
         return self.__elements
@@ -75,21 +114,22 @@ class DirectedBondgraph(BondgraphViewer, CausalBondgraph):
     ) -> list[sp.Function]:
         if element_id != None:
             return self.__elements[element_id].get_vars(var_type, self.__time_var, as_funcs)
-        vars: list[sp.Function] = []
+        # Dict keys keep insertion order and give constant time duplicate checks
+        vars: dict[sp.Function,None] = {}
         for ekey in self.__elements:
             el_vars: list[sp.Function] = self.__elements[ekey].get_vars(
                 var_type,
                 self.__time_var,
                 as_funcs
             )
-            for ev in filter(lambda v: v not in vars, el_vars):
-                vars.append(ev)
-        return vars
+            for ev in el_vars:
+                vars.setdefault(ev, None)
+        return list(vars)
 
     def show_elements(self):
         print("Elements:")
         for ekey in self.__elements:
-            print(ekey, ":", self.__elements[ekey].get_vars("all", self.__time_var))
+            print(ekey, ":", self.__elements[ekey].get_all_vars(self.__time_var))
         print()
 
     def show_bonds(self):
@@ -107,6 +147,26 @@ class DirectedBondgraph(BondgraphViewer, CausalBondgraph):
                 print(bond.get_index(), ":", eff_caus_dir[0], eff_caus_dir[1])
         print()
 
+    def __compile_solution(self, solution_nr: int, solution: dict, variables: list[sp.Function]) -> Callable:
+        key: tuple[int,tuple] = (solution_nr, tuple(variables))
+        if key in self.__compiled_solutions:
+            return self.__compiled_solutions[key]
+        time_var: sp.Symbol = self.__time_var
+        func: Callable|None = None
+        # INFO: lambdify lowers Piecewise to a vectorized numpy.select, which numba cannot type
+        has_piecewise: bool = any(solution[var].has(sp.Piecewise) for var in variables)
+        if numba != None and not has_piecewise:
+            # JIT compilation is lazy, so try it once and keep the plain function if numba cannot type it
+            try:
+                func = Solver.compile_solution(solution, variables, time_var, backend="numba")
+                func(np.zeros(1))
+            except Exception:
+                func = None
+        if func == None:
+            func = Solver.compile_solution(solution, variables, time_var)
+        self.__compiled_solutions[key] = func
+        return func
+
     def simulate(
         self,
         start_time: float,
@@ -114,43 +174,52 @@ class DirectedBondgraph(BondgraphViewer, CausalBondgraph):
         step_size: float,
         variables: list[sp.Function],
         solution_nr: int,
-    ) -> dict[str,list[float]]:
-        time_var: sp.Symbol = self.get_time_var()
+    ) -> dict[str,np.ndarray]:
         solution: dict = self.get_solutions(log=True)[solution_nr]
-        data_sets: dict[str,list[float]] = {}
-        data_sets["t"] = []
-        t: float = start_time
-        for var in variables:
-            data_sets[str(var)] = []
-        for step in range(0, step_number):
-            t = start_time + step * step_size
-            data_sets["t"].append(t)
-            for var in variables:
-                data_sets[str(var)].append(
-                    solution[var].subs(time_var, t).doit()
-                )
+        data_sets: dict[str,np.ndarray] = {}
+        t_arr: np.ndarray = start_time + np.arange(step_number, dtype=np.float64) * step_size
+        data_sets["t"] = t_arr
+        # Evaluate all variables for all time steps at once, sharing common subexpressions
+        func: Callable = self.__compile_solution(solution_nr, solution, variables)
+        for var, result in zip(variables, func(t_arr)):
+            values: np.ndarray = np.empty(step_number, dtype=np.float64)
+            values[:] = result
+            data_sets[str(var)] = values
         return data_sets
 
     def get_equations(self) -> list[BondgraphEquation]:
+        if self.__equations != None:
+            return self.__equations
+        self._ensure_causalities()
         equations: list[BondgraphEquation] = []
+        measurements: dict[str,sp.Function] = Element.get_measurements(self.__elements, self.__time_var)
         for el_key in self.__elements:
             element: Element = self.__elements[el_key]
             el_equations: list[BondgraphEquation] = element.get_equations(
                 self.__elements,
                 self.__time_var,
-                self.__tau
+                self.__tau,
+                measurements,
             )
             equations.extend(el_equations)
+        self.__equations = equations
         return equations
 
     def get_solutions(self, log: bool = False) -> list[dict]:
-        return Solver.get_solutions(
+        if self.__solutions != None:
+            if log:
+                # Solutions are memoized, but a requested log is still printed
+                for line in self.__solution_log:
+                    print(line)
+            return self.__solutions
+        # Drop the partial log of a previously failed solve
+        self.__solution_log.clear()
+        self.__solutions = Solver.get_solutions(
             self.get_equations(),
             self.get_vars(),
             self.get_vars(as_funcs=True),
             self.__time_var,
-            self.__tau,
-            log
+            log,
+            self.__solution_log,
         )
-
-
+        return self.__solutions
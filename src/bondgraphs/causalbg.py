@@ -1,7 +1,32 @@
 from __future__ import annotations
+import functools
+from collections import deque
 from .element import *
 from .bond import *
 
+# Element classes that causality assignment handles, subclasses are treated like their base
+_ELEMENT_TYPES: tuple[type,...] = (
+    EffortSource,
+    FlowSource,
+    EffortSensor,
+    FlowSensor,
+    EffortController,
+    FlowController,
+    CommonEffortJunction,
+    CommonFlowJunction,
+    Transformer,
+    Gyrator,
+    Resistance,
+    Capacitance,
+    Inertance,
+)
+
+
+@functools.lru_cache(maxsize=128)
+def _matching_element_types(element_type: type) -> tuple[type,...]:
+    return tuple(t for t in _ELEMENT_TYPES if issubclass(element_type, t))
+
+
 class CausalBondgraph():
 
     def get_elements(self) -> dict[str,Element]:
@@ -10,98 +35,113 @@ class CausalBondgraph():
     def get_bonds(self) -> list[Bond]:
         raise NotImplementedError
 
+    # Bonds without triggering causality assignment, which is still running when this is called
+    def _get_raw_bonds(self) -> list[Bond]:
+        raise NotImplementedError
+
     def get_time_var(self) -> sp.Symbol:
         raise NotImplementedError
 
-    def __propagate_causalities(self) -> bool:
-        change: bool = False
+    def __sort_elements_by_type(self):
         elements: dict[str,Element] = self.get_elements()
+        self.__element_keys_by_type: dict[type,list[str]] = {t: [] for t in _ELEMENT_TYPES}
+        for ekey, element in elements.items():
+            for element_type in _matching_element_types(type(element)):
+                self.__element_keys_by_type[element_type].append(ekey)
 
-        # Effort junctions
-        for ekey in filter(lambda e: isinstance(elements[e], CommonEffortJunction), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                eff_caus_dir: tuple[str,str]|None = bond.get_effort_causality_direction()
-                if eff_caus_dir and eff_caus_dir[1] == ekey:
-                    for other_bond in filter(lambda b: b != bond, element.get_bonds()):
-                        other_eff_caus_dir: tuple[str,str]|None = other_bond.get_effort_causality_direction()
-                        if other_eff_caus_dir == None:
-                            other_bond.set_effort_causality_direction_from(ekey)
-                            change = True
-                        elif other_eff_caus_dir[0] == ekey:
-                            pass
-                        else:
-                            raise Exception("Causal conflict during propagation", str(other_bond))
-
-        # Flow junctions
-        for ekey in filter(lambda e: isinstance(elements[e], CommonFlowJunction), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                flow_caus_dir: tuple[str,str]|None = bond.get_flow_causality_direction()
-                if flow_caus_dir and flow_caus_dir[1] == ekey:
-                    for other_bond in filter(lambda b: b != bond, element.get_bonds()):
-                        other_flow_caus_dir: tuple[str,str]|None = other_bond.get_flow_causality_direction()
-                        if other_flow_caus_dir == None:
-                            other_bond.set_flow_causality_direction_from(ekey)
-                            change = True
-                        elif other_flow_caus_dir[0] == ekey:
-                            pass
-                        else:
-                            raise Exception("Causal conflict during propagation", str(other_bond))
-
-        # Transformers
-        for ekey in filter(lambda e: isinstance(elements[e], Transformer), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                effort_caus_dir: tuple[str,str]|None = bond.get_effort_causality_direction()
-                if effort_caus_dir and effort_caus_dir[1] == ekey:
-                    for other_bond in filter(lambda b: b != bond, element.get_bonds()):
-                        other_effort_caus_dir: tuple[str,str]|None = other_bond.get_effort_causality_direction()
-                        if other_effort_caus_dir == None:
-                            other_bond.set_effort_causality_direction_from(ekey)
-                            change = True
-                        elif other_effort_caus_dir[0] == ekey:
-                            pass
-                        else:
-                            raise Exception("Causal conflict during propagation", str(other_bond))
-                elif effort_caus_dir and effort_caus_dir[0] == ekey:
-                    for other_bond in filter(lambda b: b != bond, element.get_bonds()):
-                        other_effort_caus_dir: tuple[str,str]|None = other_bond.get_effort_causality_direction()
-                        if other_effort_caus_dir == None:
-                            other_bond.set_effort_causality_direction_towards(ekey)
-                            change = True
-                        elif other_effort_caus_dir[1] == ekey:
-                            pass
-                        else:
-                            raise Exception("Causal conflict during propagation", str(other_bond))
-
-        # Gyrators
-        for ekey in filter(lambda e: isinstance(elements[e], Gyrator), elements):
+    def __get_element_keys_of_type(self, element_type: type) -> list[str]:
+        return self.__element_keys_by_type[element_type]
+
+    def __index_bonds(self):
+        elements: dict[str,Element] = self.get_elements()
+        self.__element_bonds: dict[str,list[Bond]] = {
+            ekey: list(element.get_bonds()) for ekey, element in elements.items()
+        }
+        self.__bond_endpoints: dict[int,tuple[str,str]] = {
+            id(bond): (bond.get_start(), bond.get_end()) for bond in self._get_raw_bonds()
+        }
+
+    def __enqueue(self, el_name: str):
+        if el_name not in self.__queued:
+            self.__queued.add(el_name)
+            self.__queue.append(el_name)
+
+    def __enqueue_bond(self, bond: Bond):
+        start, end = self.__bond_endpoints[id(bond)]
+        self.__enqueue(start)
+        self.__enqueue(end)
+
+    def __propagate_effort_junction(self, ekey: str):
+        bonds: list[Bond] = self.__element_bonds[ekey]
+        for i, bond in enumerate(bonds):
+            eff_caus_dir: tuple[str,str]|None = bond.get_effort_causality_direction()
+            if eff_caus_dir and eff_caus_dir[1] == ekey:
+                for j, other_bond in enumerate(bonds):
+                    if j == i:
+                        continue
+                    if other_bond.set_effort_causality_direction_from(ekey):
+                        self.__enqueue_bond(other_bond)
+
+    def __propagate_flow_junction(self, ekey: str):
+        bonds: list[Bond] = self.__element_bonds[ekey]
+        for i, bond in enumerate(bonds):
+            flow_caus_dir: tuple[str,str]|None = bond.get_flow_causality_direction()
+            if flow_caus_dir and flow_caus_dir[1] == ekey:
+                for j, other_bond in enumerate(bonds):
+                    if j == i:
+                        continue
+                    if other_bond.set_flow_causality_direction_from(ekey):
+                        self.__enqueue_bond(other_bond)
+
+    def __propagate_transformer(self, ekey: str):
+        bonds: list[Bond] = self.__element_bonds[ekey]
+        for i, bond in enumerate(bonds):
+            effort_caus_dir: tuple[str,str]|None = bond.get_effort_causality_direction()
+            if effort_caus_dir and effort_caus_dir[1] == ekey:
+                for j, other_bond in enumerate(bonds):
+                    if j == i:
+                        continue
+                    if other_bond.set_effort_causality_direction_from(ekey):
+                        self.__enqueue_bond(other_bond)
+            elif effort_caus_dir and effort_caus_dir[0] == ekey:
+                for j, other_bond in enumerate(bonds):
+                    if j == i:
+                        continue
+                    if other_bond.set_effort_causality_direction_towards(ekey):
+                        self.__enqueue_bond(other_bond)
+
+    def __propagate_gyrator(self, ekey: str):
+        bonds: list[Bond] = self.__element_bonds[ekey]
+        for i, bond in enumerate(bonds):
+            effort_caus_dir: tuple[str,str]|None = bond.get_effort_causality_direction()
+            if effort_caus_dir and effort_caus_dir[1] == ekey:
+                for j, other_bond in enumerate(bonds):
+                    if j == i:
+                        continue
+                    if other_bond.set_effort_causality_direction_towards(ekey):
+                        self.__enqueue_bond(other_bond)
+            elif effort_caus_dir and effort_caus_dir[0] == ekey:
+                for j, other_bond in enumerate(bonds):
+                    if j == i:
+                        continue
+                    if other_bond.set_effort_causality_direction_from(ekey):
+                        self.__enqueue_bond(other_bond)
+
+    def __propagate_causalities(self):
+        # Only elements adjacent to a bond whose causality changed are (re)visited
+        elements: dict[str,Element] = self.get_elements()
+        while self.__queue:
+            ekey: str = self.__queue.popleft()
+            self.__queued.discard(ekey)
             element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                effort_caus_dir: tuple[str,str]|None = bond.get_effort_causality_direction()
-                if effort_caus_dir and effort_caus_dir[1] == ekey:
-                    for other_bond in filter(lambda b: b != bond, element.get_bonds()):
-                        other_effort_caus_dir: tuple[str,str]|None = other_bond.get_effort_causality_direction()
-                        if other_effort_caus_dir == None:
-                            other_bond.set_effort_causality_direction_towards(ekey)
-                            change = True
-                        elif other_effort_caus_dir[1] == ekey:
-                            pass
-                        else:
-                            raise Exception("Causal conflict during propagation", str(other_bond))
-                elif effort_caus_dir and effort_caus_dir[0] == ekey:
-                    for other_bond in filter(lambda b: b != bond, element.get_bonds()):
-                        other_effort_caus_dir: tuple[str,str]|None = other_bond.get_effort_causality_direction()
-                        if other_effort_caus_dir == None:
-                            other_bond.set_effort_causality_direction_from(ekey)
-                            change = True
-                        elif other_effort_caus_dir[0] == ekey:
-                            pass
-                        else:
-                            raise Exception("Causal conflict during propagation", str(other_bond))
-
-        return change
+            if isinstance(element, CommonEffortJunction):
+                self.__propagate_effort_junction(ekey)
+            elif isinstance(element, CommonFlowJunction):
+                self.__propagate_flow_junction(ekey)
+            elif isinstance(element, Transformer):
+                self.__propagate_transformer(ekey)
+            elif isinstance(element, Gyrator):
+                self.__propagate_gyrator(ekey)
 
     def _assign_causalities(self):
         # Bond causality: is effort or is flow external one at power port?
@@ -133,90 +173,99 @@ class CausalBondgraph():
         # 1) For each source in elements:
         #   1.1) Assign causality to corresponding power port of source
         elements: dict[str,Element] = self.get_elements()
-        for ekey in filter(lambda e: isinstance(elements[e], EffortSource), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                bond.set_effort_causality_direction_from(ekey)
-
-        for ekey in filter(lambda e: isinstance(elements[e], FlowSource), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                bond.set_flow_causality_direction_from(ekey)
-
-        for ekey in filter(lambda e: isinstance(elements[e], EffortSensor), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                bond.set_flow_causality_direction_from(ekey)
-
-        for ekey in filter(lambda e: isinstance(elements[e], FlowSensor), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                bond.set_effort_causality_direction_from(ekey)
-
-        for ekey in filter(lambda e: isinstance(elements[e], EffortController), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                bond.set_effort_causality_direction_from(ekey)
-
-        for ekey in filter(lambda e: isinstance(elements[e], FlowController), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                bond.set_flow_causality_direction_from(ekey)
+        self.__sort_elements_by_type()
+        self.__index_bonds()
+        self.__queue: deque[str] = deque()
+        self.__queued: set[str] = set()
+        for ekey in self.__get_element_keys_of_type(EffortSource):
+            for bond in self.__element_bonds[ekey]:
+                if bond.set_effort_causality_direction_from(ekey):
+                    self.__enqueue_bond(bond)
+
+        for ekey in self.__get_element_keys_of_type(FlowSource):
+            for bond in self.__element_bonds[ekey]:
+                if bond.set_flow_causality_direction_from(ekey):
+                    self.__enqueue_bond(bond)
+
+        for ekey in self.__get_element_keys_of_type(EffortSensor):
+            for bond in self.__element_bonds[ekey]:
+                if bond.set_flow_causality_direction_from(ekey):
+                    self.__enqueue_bond(bond)
+
+        for ekey in self.__get_element_keys_of_type(FlowSensor):
+            for bond in self.__element_bonds[ekey]:
+                if bond.set_effort_causality_direction_from(ekey):
+                    self.__enqueue_bond(bond)
+
+        for ekey in self.__get_element_keys_of_type(EffortController):
+            for bond in self.__element_bonds[ekey]:
+                if bond.set_effort_causality_direction_from(ekey):
+                    self.__enqueue_bond(bond)
+
+        for ekey in self.__get_element_keys_of_type(FlowController):
+            for bond in self.__element_bonds[ekey]:
+                if bond.set_flow_causality_direction_from(ekey):
+                    self.__enqueue_bond(bond)
 
         #   1.2) Propagate information through bond graph
         #   1.3) If causal conflict: check model assumptions
 
-        # Continue as long as there are changes and no conflicts
-        while self.__propagate_causalities():
-            pass
+        # Continue as long as there are queued elements and no conflicts
+        self.__propagate_causalities()
 
         # 2) For each resistor port without unique inverse:
         #   2.1) Assign correct causality
         #   2.2) Propagate information through bond graph
-        for ekey in filter(lambda e: isinstance(elements[e], Resistance), elements):
+        time_var: sp.Symbol = self.get_time_var()
+        for ekey in self.__get_element_keys_of_type(Resistance):
             element: Element = elements[ekey]
-            for bond in element.get_bonds():
-                if not element.is_constitutive_equation_invertible(self.get_time_var()):
-                    if element.is_constitutive_equation_solvable_for("effort", self.get_time_var()):
-                        bond.set_effort_causality_direction_from(ekey)
-                    elif element.is_constitutive_equation_solvable_for("flow", self.get_time_var()):
-                        bond.set_flow_causality_direction_from(ekey)
-                    else:
-                        raise Exception("Equation for", ekey, "not solvable at all.")
-
-        # Continue as long as there are changes and no conflicts
-        while self.__propagate_causalities():
-            pass
+            if element.is_constitutive_equation_invertible(time_var):
+                continue
+            solvable_for_effort: bool = element.is_constitutive_equation_solvable_for("effort", time_var)
+            solvable_for_flow: bool = (
+                not solvable_for_effort
+                and element.is_constitutive_equation_solvable_for("flow", time_var)
+            )
+            for bond in self.__element_bonds[ekey]:
+                if solvable_for_effort:
+                    if bond.set_effort_causality_direction_from(ekey):
+                        self.__enqueue_bond(bond)
+                elif solvable_for_flow:
+                    if bond.set_flow_causality_direction_from(ekey):
+                        self.__enqueue_bond(bond)
+                else:
+                    raise Exception("Equation for", ekey, "not solvable at all.")
+
+        # Continue as long as there are queued elements and no conflicts
+        self.__propagate_causalities()
 
         # 3) For each energy store without assigned causality:
         #   3.1) Assign preferred integral causality to port of energy store
         #   3.2) Propagate information (may lead to derivative causality at other energy stores and entails causality assignment at resistor ports)
-        for ekey in filter(lambda e: isinstance(elements[e], Capacitance), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
+        for ekey in self.__get_element_keys_of_type(Capacitance):
+            for bond in self.__element_bonds[ekey]:
                 if not bond.is_causality_set():
-                    bond.set_flow_causality_direction_towards(ekey)
-                    # Continue as long as there are changes and no conflicts
-                    while self.__propagate_causalities():
-                        pass
+                    if bond.set_flow_causality_direction_towards(ekey):
+                        self.__enqueue_bond(bond)
+                    # Continue as long as there are queued elements and no conflicts
+                    self.__propagate_causalities()
 
-        for ekey in filter(lambda e: isinstance(elements[e], Inertance), elements):
-            element: Element = elements[ekey]
-            for bond in element.get_bonds():
+        for ekey in self.__get_element_keys_of_type(Inertance):
+            for bond in self.__element_bonds[ekey]:
                 if not bond.is_causality_set():
-                    bond.set_effort_causality_direction_towards(ekey)
-                    # Continue as long as there are changes and no conflicts
-                    while self.__propagate_causalities():
-                        pass
+                    if bond.set_effort_causality_direction_towards(ekey):
+                        self.__enqueue_bond(bond)
+                    # Continue as long as there are queued elements and no conflicts
+                    self.__propagate_causalities()
 
         # 4) For each resistors and internal bonds without causality: (If this is needed, there are algebraic loops)
         #   4.1) Assign causality randomly
         #   4.2) Propagate
-        for bond in self.get_bonds():
+        for bond in self._get_raw_bonds():
             if not bond.is_causality_set():
                 print("WARNING: BOND", bond, "HAS NOT BEEN ASSIGNED YET, THERE ARE ALGEBRAIC LOOPS.")
                 end: str = bond.get_end()
-                bond.set_effort_causality_direction_towards(end)
-                while self.__propagate_causalities():
-                    pass
+                if bond.set_effort_causality_direction_towards(end):
+                    self.__enqueue_bond(bond)
+                self.__propagate_causalities()
 
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import functools
 from typing import Callable
 import sympy as sp
 
@@ -6,8 +7,51 @@ from .bond import *
 from .equation import *
 
 
+# Shared placeholders, so equal constitutive equations of different elements give equal symbolic forms
+_FIRST_ARG: sp.Dummy = sp.Dummy("x", real=True)
+_SECOND_ARG: sp.Dummy = sp.Dummy("y", real=True)
+
+
+@functools.lru_cache(maxsize=128)
+def _solve_symbolic_form(form: sp.Expr, unknown: sp.Dummy) -> tuple:
+    return tuple(sp.solve(form, unknown))
+
+
 class Element():
     # WARN: Constitutive equations are always of the form eq(.) = 0
+    __slots__ = (
+        "__constitutive_equation",
+        "__initial_value",
+        "__identifier",
+        "__in_bonds",
+        "__out_bonds",
+        "__in_bond_ids",
+        "__out_bond_ids",
+        "__bonds",
+        "__solvable_cache",
+        "__symbolic_form",
+    )
+    # Element kind never changes, so predicates read class-level flags set by the concrete classes
+    _is_junction: bool = False
+    _is_storage: bool = False
+    _is_source: bool = False
+    _is_sensor: bool = False
+    _is_controller: bool = False
+    _is_oneport: bool = False
+    _is_twoport: bool = False
+    _is_resistance: bool = False
+    _is_capacitance: bool = False
+    _is_inertance: bool = False
+    _is_effort_source: bool = False
+    _is_flow_source: bool = False
+    _is_effort_sensor: bool = False
+    _is_flow_sensor: bool = False
+    _is_effort_controller: bool = False
+    _is_flow_controller: bool = False
+    _is_common_effort_junction: bool = False
+    _is_common_flow_junction: bool = False
+    _is_transformer: bool = False
+    _is_gyrator: bool = False
 
     def __init__(
         self,
@@ -20,20 +64,33 @@ class Element():
         self.__identifier: str = identifier
         self.__in_bonds: list[Bond] = []
         self.__out_bonds: list[Bond] = []
+        # Bond ids for constant time duplicate checks, bonds define no equality of their own
+        self.__in_bond_ids: set[int] = set()
+        self.__out_bond_ids: set[int] = set()
+        # In- and outgoing bonds in one tuple, rebuilt on first access after a bond is added
+        self.__bonds: tuple[Bond,...]|None = None
+        # Solvability only depends on the constitutive equation, keyed by time variable
+        self.__solvable_cache: dict[sp.Symbol,tuple[bool,bool]] = {}
+        # Constitutive equation evaluated once on the shared placeholder arguments
+        self.__symbolic_form: sp.Expr|None = None
 
     def add_in_bond(self, bond: Bond):
         if self.__identifier != bond.get_end():
             raise Exception("Bond " + str(bond) + " does not contain element " + self.__identifier)
-        if bond in self.__in_bonds:
-            raise Exception("Bond " + str(bond) + " already in element" + self.__identifier)
+        if id(bond) in self.__in_bond_ids:
+            raise Exception("Bond " + str(bond) + " already in element " + self.__identifier)
+        self.__in_bond_ids.add(id(bond))
         self.__in_bonds.append(bond)
+        self.__bonds = None
 
     def add_out_bond(self, bond: Bond):
         if self.__identifier != bond.get_start():
             raise Exception("Bond " + str(bond) + " does not contain element " + self.__identifier)
-        if bond in self.__in_bonds:
-            raise Exception("Bond " + str(bond) + " already in element" + self.__identifier)
+        if id(bond) in self.__out_bond_ids:
+            raise Exception("Bond " + str(bond) + " already in element " + self.__identifier)
+        self.__out_bond_ids.add(id(bond))
         self.__out_bonds.append(bond)
+        self.__bonds = None
 
     def get_in_bonds(self) -> list[Bond]:
         return self.__in_bonds
@@ -41,8 +98,10 @@ class Element():
     def get_out_bonds(self) -> list[Bond]:
         return self.__out_bonds
 
-    def get_bonds(self) -> list[Bond]:
-        return self.__in_bonds + self.__out_bonds
+    def get_bonds(self) -> tuple[Bond,...]:
+        if self.__bonds == None:
+            self.__bonds = tuple(self.__in_bonds) + tuple(self.__out_bonds)
+        return self.__bonds
 
     def check_bonds(self):
         if self.is_oneport():
@@ -61,75 +120,65 @@ class Element():
                     "Wrong number of in- and outgoing power bonds for " + self.get_identifier()
                 )
 
-    def is_junction(self):
-        return self.is_common_effort_junction() or self.is_common_flow_junction()
+    def is_junction(self) -> bool:
+        return self._is_junction
 
-    def is_storage(self):
-        return self.is_inertance() or self.is_capacitance()
+    def is_storage(self) -> bool:
+        return self._is_storage
 
-    def is_source(self):
-        return self.is_effort_source() or self.is_flow_source()
+    def is_source(self) -> bool:
+        return self._is_source
 
-    def is_sensor(self):
-        return self.is_effort_sensor() or self.is_flow_sensor()
+    def is_sensor(self) -> bool:
+        return self._is_sensor
 
-    def is_controller(self):
-        return self.is_effort_controller() or self.is_flow_controller()
+    def is_controller(self) -> bool:
+        return self._is_controller
 
     def is_oneport(self) -> bool:
-        return type(self) in [
-            Capacitance,
-            Inertance,
-            Resistance,
-            EffortSource,
-            FlowSource,
-            EffortSensor,
-            FlowSensor,
-            EffortController,
-            FlowController,
-        ]
+        return self._is_oneport
 
     def is_twoport(self) -> bool:
-        return type(self) in [Transformer, Gyrator]
+        return self._is_twoport
 
-    def is_resistance(self):
-        return isinstance(self, Resistance)
+    def is_resistance(self) -> bool:
+        return self._is_resistance
 
-    def is_capacitance(self):
-        return isinstance(self, Capacitance)
+    def is_capacitance(self) -> bool:
+        return self._is_capacitance
 
-    def is_inertance(self):
-        return isinstance(self, Inertance)
+    def is_inertance(self) -> bool:
+        return self._is_inertance
 
-    def is_effort_source(self):
-        return isinstance(self, EffortSource)
+    def is_effort_source(self) -> bool:
+        return self._is_effort_source
 
-    def is_flow_source(self):
-        return isinstance(self, FlowSource)
+    def is_flow_source(self) -> bool:
+        return self._is_flow_source
 
-    def is_effort_sensor(self):
-        return isinstance(self, EffortSensor)
+    def is_effort_sensor(self) -> bool:
+        return self._is_effort_sensor
 
-    def is_flow_sensor(self):
-        return isinstance(self, FlowSensor)
+    def is_flow_sensor(self) -> bool:
+        return self._is_flow_sensor
 
-    def is_effort_controller(self):
-        return isinstance(self, EffortController)
+    def is_effort_controller(self) -> bool:
+        return self._is_effort_controller
 
-    def is_flow_controller(self):
-        return isinstance(self, FlowController)
+    def is_flow_controller(self) -> bool:
+        return self._is_flow_controller
 
-    def is_common_effort_junction(self):
-        return isinstance(self, CommonEffortJunction)
+    def is_common_effort_junction(self) -> bool:
+        return self._is_common_effort_junction
 
-    def is_common_flow_junction(self):
-        return isinstance(self, CommonFlowJunction)
+    def is_common_flow_junction(self) -> bool:
+        return self._is_common_flow_junction
 
-    def is_transformer(self):
-        return isinstance(self, Transformer)
+    def is_transformer(self) -> bool:
+        return self._is_transformer
 
-    def is_gyrator(self):
-        return isinstance(self, Gyrator)
+    def is_gyrator(self) -> bool:
+        return self._is_gyrator
 
     def get_initial_value(self) -> float|None:
         return self.__initial_value
@@ -140,85 +189,76 @@ class Element():
     def get_constitutive_equation(self) -> Callable|None:
         return self.__constitutive_equation
 
+    def get_effort_vars(self, time_var: sp.Symbol, as_funcs: bool = False) -> list[sp.Function]:
+        arg: sp.Symbol|None = None if as_funcs else time_var
+        return [b.get_effort(arg) for b in self.get_bonds()]
+
+    def get_flow_vars(self, time_var: sp.Symbol, as_funcs: bool = False) -> list[sp.Function]:
+        arg: sp.Symbol|None = None if as_funcs else time_var
+        return [b.get_flow(arg) for b in self.get_bonds()]
+
+    def get_displacement_vars(self, time_var: sp.Symbol, as_funcs: bool = False) -> list[sp.Function]:
+        if not self.is_capacitance():
+            return []
+        arg: sp.Symbol|None = None if as_funcs else time_var
+        return [b.get_displacement(arg) for b in self.get_bonds()]
+
+    def get_momentum_vars(self, time_var: sp.Symbol, as_funcs: bool = False) -> list[sp.Function]:
+        if not self.is_inertance():
+            return []
+        arg: sp.Symbol|None = None if as_funcs else time_var
+        return [b.get_momentum(arg) for b in self.get_bonds()]
+
+    def get_power_vars(self, time_var: sp.Symbol, as_funcs: bool = False) -> list[sp.Function]:
+        arg: sp.Symbol|None = None if as_funcs else time_var
+        vars: list[sp.Function] = []
+        for b in self.get_bonds():
+            vars.append(b.get_effort(arg))
+            vars.append(b.get_flow(arg))
+        return vars
+
+    def get_energy_vars(self, time_var: sp.Symbol, as_funcs: bool = False) -> list[sp.Function]:
+        if self.is_inertance():
+            return self.get_momentum_vars(time_var, as_funcs)
+        return self.get_displacement_vars(time_var, as_funcs)
+
+    def get_all_vars(self, time_var: sp.Symbol, as_funcs: bool = False) -> list[sp.Function]:
+        arg: sp.Symbol|None = None if as_funcs else time_var
+        is_capacitance: bool = self.is_capacitance()
+        is_inertance: bool = self.is_inertance()
+        vars: list[sp.Function] = []
+        for b in self.get_bonds():
+            vars.append(b.get_effort(arg))
+            vars.append(b.get_flow(arg))
+            if is_capacitance:
+                vars.append(b.get_displacement(arg))
+            if is_inertance:
+                vars.append(b.get_momentum(arg))
+        return vars
+
     def get_vars(
         self,
         var_type: str,
         time_var: sp.Symbol,
         as_funcs: bool = False
     ) -> list[sp.Function]:
-        vars: list[sp.Function] = []
-        for b in self.get_bonds():
-            match var_type:
-                case "effort":
-                    if as_funcs:
-                        vars.append(b.get_effort())
-                    else:
-                        vars.append(b.get_effort(time_var))
-                case "flow":
-                    if as_funcs:
-                        vars.append(b.get_flow())
-                    else:
-                        vars.append(b.get_flow(time_var))
-                case "displacement":
-                    if self.is_capacitance():
-                        if as_funcs:
-                            vars.append(b.get_displacement())
-                        else:
-                            vars.append(b.get_displacement(time_var))
-                case "momentum":
-                    if self.is_inertance():
-                        if as_funcs:
-                            vars.append(b.get_momentum())
-                        else:
-                            vars.append(b.get_momentum(time_var))
-                case "power":
-                    if as_funcs:
-                        vars.extend([
-                            b.get_effort(),
-                            b.get_flow(),
-                        ])
-                    else:
-                        vars.extend([
-                            b.get_effort(time_var),
-                            b.get_flow(time_var),
-                        ])
-                case "energy":
-                    if self.is_inertance():
-                        if as_funcs:
-                            vars.extend([
-                                b.get_momentum()
-                            ])
-                        else:
-                            vars.extend([
-                                b.get_momentum(time_var)
-                            ])
-                    elif self.is_capacitance():
-                        if as_funcs:
-                            vars.extend([
-                                b.get_displacement()
-                            ])
-                        else:
-                            vars.extend([
-                                b.get_displacement(time_var)
-                            ])
-                case "all":
-                    if as_funcs:
-                        vars.append(b.get_effort())
-                        vars.append(b.get_flow())
-                        if self.is_capacitance():
-                            vars.append(b.get_displacement())
-                        if self.is_inertance():
-                            vars.append(b.get_momentum())
-                    else:
-                        vars.append(b.get_effort(time_var))
-                        vars.append(b.get_flow(time_var))
-                        if self.is_capacitance():
-                            vars.append(b.get_displacement(time_var))
-                        if self.is_inertance():
-                            vars.append(b.get_momentum(time_var))
-                case _:
-                    raise Exception("Unknown variable type " + var_type + ".")
-        return vars
+        match var_type:
+            case "effort":
+                return self.get_effort_vars(time_var, as_funcs)
+            case "flow":
+                return self.get_flow_vars(time_var, as_funcs)
+            case "displacement":
+                return self.get_displacement_vars(time_var, as_funcs)
+            case "momentum":
+                return self.get_momentum_vars(time_var, as_funcs)
+            case "power":
+                return self.get_power_vars(time_var, as_funcs)
+            case "energy":
+                return self.get_energy_vars(time_var, as_funcs)
+            case "all":
+                return self.get_all_vars(time_var, as_funcs)
+            case _:
+                raise Exception("Unknown variable type " + var_type + ".")
 
     def is_effort_input(self, bond: Bond) -> bool:
         caus_edge: tuple[str,str]|None = bond.get_effort_causality_direction()
@@ -230,200 +270,59 @@ class Element():
     def is_flow_input(self, bond: Bond) -> bool:
         return not self.is_effort_input(bond)
 
+    def __get_symbolic_form(self) -> sp.Expr:
+        if self.__symbolic_form == None:
+            eq: Callable|None = self.get_constitutive_equation()
+            if eq == None:
+                raise Exception("Constitutive equation should not be none for", self.get_identifier())
+            self.__symbolic_form = eq(_FIRST_ARG, _SECOND_ARG)
+        return self.__symbolic_form
+
+    def _solve_constitutive_equation(self, first: sp.Expr, second: sp.Expr, unknown: sp.Expr) -> list:
+        # Only for constitutive equations relating two power or energy variables (C, I, R, TF, GY)
+        # Elements with equal symbolic forms (e.g. linear resistors of equal value) share one solve
+        unknown_arg: sp.Dummy = _FIRST_ARG if unknown == first else _SECOND_ARG
+        sols: tuple = _solve_symbolic_form(self.__get_symbolic_form(), unknown_arg)
+        return [sol.xreplace({_FIRST_ARG: first, _SECOND_ARG: second}) for sol in sols]
+
+    def _solve_for_both(self, time_var: sp.Symbol) -> tuple[bool,bool]:
+        # Returns (solvable for effort, solvable for flow), computed once per time variable
+        if time_var not in self.__solvable_cache:
+            if not self.is_resistance():
+                raise Exception("Checking invertibility not implemented for non-resistance.", self.get_identifier())
+            eq: Callable|None = self.get_constitutive_equation()
+            if eq == None:
+                raise Exception("Constitutive equation should not be none for", self.get_identifier())
+            bonds: tuple[Bond,...] = self.get_bonds()
+            if len(bonds) != 1:
+                raise Exception("Wrong number of connected bonds for", self.get_identifier())
+            effort: sp.Function = bonds[0].get_effort(time_var)
+            flow: sp.Function = bonds[0].get_flow(time_var)
+            self.__solvable_cache[time_var] = (
+                len(self._solve_constitutive_equation(effort, flow, effort)) > 0,
+                len(self._solve_constitutive_equation(effort, flow, flow)) > 0,
+            )
+        return self.__solvable_cache[time_var]
+
     def is_constitutive_equation_solvable_for(self, var_type: str, time_var: sp.Symbol) -> bool:
-        if not self.is_resistance():
-            raise Exception("Checking invertibility not implemented for non-resistance.", self.get_identifier())
-        eq: Callable|None = self.get_constitutive_equation()
-        if eq == None:
-            raise Exception("Constitutive equation should not be none for", self.get_identifier())
-        bonds: list[Bond] = self.get_bonds()
-        if len(bonds) != 1:
-            raise Exception("Wrong number of connected bonds for", self.get_identifier())
-        bond: Bond = bonds[0]
-        effort: sp.Function = bond.get_effort(time_var)
-        flow: sp.Function = bond.get_flow(time_var)
-        res_effort = sp.solve(eq(effort, flow), effort)
-        res_flow = sp.solve(eq(effort, flow), flow)
         if var_type == "effort":
-            return len(res_effort) > 0
+            return self._solve_for_both(time_var)[0]
         elif var_type == "flow":
-            return len(res_flow) > 0
+            return self._solve_for_both(time_var)[1]
         else:
             raise Exception("Checking solvability not implemented for var type", var_type)
 
     def is_constitutive_equation_invertible(self, time_var: sp.Symbol) -> bool:
-        if not self.is_resistance():
-            raise Exception("Checking invertibility not implemented for", self.get_identifier())
-        is_eff: bool = self.is_constitutive_equation_solvable_for("effort", time_var)
-        is_flow: bool = self.is_constitutive_equation_solvable_for("flow", time_var)
+        is_eff, is_flow = self._solve_for_both(time_var)
         return is_eff and is_flow
 
-    def __get_oneport_equations(self, elements: dict[str,Element], time_var: sp.Symbol, tau: sp.Symbol) -> list:
-        eq: Callable|None = self.get_constitutive_equation()
-        # if eq == None:
-        #     raise Exception("Constitutive equation should not be None for " + self.get_identifier())
-        bond: Bond = self.get_bonds()[0]
-        effort_in: bool = self.is_effort_input(bond)
-        flow_in: bool = self.is_flow_input(bond)
-        effort: sp.Function = bond.get_effort(time_var)
-        flow: sp.Function = bond.get_flow(time_var)
-        displacement: sp.Function = bond.get_displacement(time_var)
-        momentum: sp.Function = bond.get_momentum(time_var)
-        init_val: float|None = self.get_initial_value()
-        equations: list = []
-        # INFO: C : q(t) = phi_C(e(t)), d/dt q = f(t)
-        if self.is_capacitance():
-            if init_val == None:
-                raise Exception("Initial value should not be none for", self.get_identifier())
-            disp_func = bond.get_displacement()
-            if effort_in:
-                sols = sp.solve(eq(effort, displacement), displacement)
-                expr = sols[0]
-                if isinstance(expr, Callable):
-                    res = expr(effort)
-                else:
-                    res = expr
-                equations.extend([
-                    BondgraphEquation(sp.Equality(res, displacement)),
-                    BondgraphEquation(
-                        sp.Equality(sp.diff(displacement), flow),
-                        initial_values = { disp_func(0): init_val },
-                    ),
-                ])
-            elif flow_in:
-                flow_func: sp.Function = bond.get_flow()
-                sols = sp.solve(eq(effort, displacement), effort)
-                expr = sols[0]
-                if isinstance(expr, Callable):
-                    res = expr(displacement)
-                else:
-                    res = expr
-                equations.extend([
-                    BondgraphEquation(sp.Equality(res, effort)),
-                    BondgraphEquation(
-                        sp.Equality(
-                            sp.integrate(flow_func(tau), (tau, 0, time_var)) + init_val,
-                            displacement
-                        ),
-                        initial_values = { disp_func(0): init_val }
-                    ),
-                ])
-        # INFO: I : p(t) = phi_I(f(t)), d/dt p = e(t)
-        elif self.is_inertance():
-            if init_val == None:
-                raise Exception("Initial value should not be none for", self.get_identifier())
-            mom_func: sp.Function = bond.get_momentum()
-            if effort_in:
-                effort_func: sp.Function = bond.get_effort()
-                sols: list = sp.solve(eq(flow, momentum), flow)
-                expr = sols[0]
-                if isinstance(expr, Callable):
-                    res = expr(momentum)
-                else:
-                    res = expr
-                equations.extend([
-                    BondgraphEquation(sp.Equality(res, flow)),
-                    BondgraphEquation(
-                        sp.Equality(
-                            sp.integrate(effort_func(tau), (tau, 0, time_var)) + init_val,
-                            momentum
-                        ),
-                        initial_values = { mom_func(0): init_val }
-                    ),
-                ])
-            elif flow_in:
-                sols: list = sp.solve(eq(flow, momentum), momentum)
-                if len(sols) > 0:
-                    expr = sols[0]
-                else:
-                    expr = momentum
-                if isinstance(expr, Callable):
-                    res = expr(flow)
-                else:
-                    res = expr
-                equations.extend([
-                    BondgraphEquation(sp.Equality(res, momentum)),
-                    BondgraphEquation(
-                        sp.Equality(sp.diff(momentum), effort),
-                        initial_values = { mom_func(0): init_val }
-                    ),
-                ])
-        # INFO: R : e(t) = phi_R(f(t))
-        elif self.is_resistance():
-            if effort_in:
-                expr = sp.solve(eq(effort, flow), flow)[0]
-                if isinstance(expr, Callable):
-                    res = expr(effort)
-                else:
-                    res = expr
-                equations.extend([
-                    BondgraphEquation(sp.Equality(res, flow)),
-                ])
-            elif flow_in:
-                expr = sp.solve(eq(effort, flow), effort)[0]
-                if isinstance(expr, Callable):
-                    res = expr(flow)
-                else:
-                    res = expr
-                equations.extend([
-                    BondgraphEquation(sp.Equality(res, effort)),
-                ])
-        # INFO: Se : e(t) = h(t)
-        elif self.is_effort_source():
-            equations.extend([
-                BondgraphEquation(sp.Equality(eq(time_var), effort)),
-            ])
-        # INFO: Sf : f(t) = g(t)
-        elif self.is_flow_source():
-            equations.extend([
-                BondgraphEquation(sp.Equality(eq(time_var), flow)),
-            ])
-        # INFO: De : f(t) = 0
-        elif self.is_effort_sensor():
-            equations.extend([
-                BondgraphEquation(sp.Equality(0, flow)),
-            ])
-        # INFO: Df : e(t) = 0
-        elif self.is_flow_sensor():
-            equations.extend([
-                BondgraphEquation(sp.Equality(0, effort)),
-            ])
-        # INFO: Ge : e(t) = f(y,t)
-        elif self.is_effort_controller():
-            measurements: dict[str,sp.Function] = {}
-            for ekey in filter(lambda e: elements[e].is_effort_sensor(), elements):
-                measurements[ekey] = elements[ekey].get_vars("effort", time_var)[0]
-            for ekey in filter(lambda e: elements[e].is_flow_sensor(), elements):
-                measurements[ekey] = elements[ekey].get_vars("flow", time_var)[0]
-            effort_func: sp.Function = self.get_vars("effort", time_var, as_funcs=True)[0]
-            equations.extend([
-                BondgraphEquation(
-                    sp.Equality(eq(time_var, measurements), effort),
-                ),
-            ])
-        # INFO: Gf : f(t) = f(y,t)
-        elif self.is_flow_controller():
-            measurements: dict[str,sp.Function] = {}
-            for ekey in filter(lambda e: elements[e].is_effort_sensor(), elements):
-                measurements[ekey] = elements[ekey].get_vars("effort", time_var)[0]
-            for ekey in filter(lambda e: elements[e].is_flow_sensor(), elements):
-                measurements[ekey] = elements[ekey].get_vars("flow", time_var)[0]
-            flow_func: sp.Function = self.get_vars("flow", time_var, as_funcs=True)[0]
-            equations.extend([
-                BondgraphEquation(
-                    sp.Equality(eq(time_var, measurements), flow),
-                ),
-            ])
-        else:
-            raise Exception("Element", self.get_identifier(), "is not a oneport.")
-        return equations
-
-    def __get_twoport_equations(self, time_var: sp.Symbol) -> list:
+    def _get_twoport_powers(self, time_var: sp.Symbol) -> tuple[sp.Function,sp.Function,sp.Function,sp.Function]:
         eq: Callable|None = self.get_constitutive_equation()
         if eq == None:
             raise Exception("Constitutive equation should not be None for " + self.get_identifier())
-        a_bond: Bond = self.get_bonds()[0]
-        b_bond: Bond = self.get_bonds()[1]
+        bonds: tuple[Bond,...] = self.get_bonds()
+        a_bond: Bond = bonds[0]
+        b_bond: Bond = bonds[1]
         a_effort_in: bool = self.is_effort_input(a_bond)
         b_effort_in: bool = self.is_effort_input(b_bond)
         if a_effort_in and b_effort_in:
@@ -440,90 +339,51 @@ class Element():
             out_effort = b_bond.get_effort(time_var)
         else:
             raise Exception("Causality for transformer", self.get_identifier(), "not fitting")
-        equations: list = []
-        # INFO: TF : e_out - phi_TF(e_in(t)) = 0, f_in - phi_TF(f_out)
-        if self.is_transformer():
-            eff_expr = sp.solve(eq(in_effort, out_effort), out_effort)[0]
-            if isinstance(eff_expr, Callable):
-                eff_res = eff_expr(in_effort)
-            else:
-                eff_res = eff_expr
-            flow_expr = sp.solve(eq(in_flow, out_flow), out_flow)[0]
-            if isinstance(flow_expr, Callable):
-                flow_res = flow_expr(in_flow)
-            else:
-                flow_res = flow_expr
-            equations.extend([
-                BondgraphEquation(sp.Equality(out_effort, eff_res)),
-                BondgraphEquation(sp.Equality(out_flow, flow_res)),
-            ])
-        # INFO: GY : e_in(t) = phi_GY(f_out(t)), e_out(t) = phy_GY(f_in(t))
-        elif self.is_gyrator():
-            eff_expr = sp.solve(eq(in_effort, out_flow), out_flow)[0]
-            if isinstance(eff_expr, Callable):
-                eff_res = eff_expr(in_effort)
-            else:
-                eff_res = eff_expr
-            flow_expr = sp.solve(eq(out_effort, in_flow), out_effort)[0]
-            if isinstance(flow_expr, Callable):
-                flow_res = flow_expr(in_flow)
-            else:
-                flow_res = flow_expr
-            equations.extend([
-                BondgraphEquation(sp.Equality(out_flow, eff_res)),
-                BondgraphEquation(sp.Equality(out_effort, flow_res)),
-            ])
-        else:
-            raise Exception("Element", self.get_identifier(), "is not a twoport.")
-        return equations
-
-    def __get_junction_equations(self, time_var: sp.Symbol) -> list:
-        eq: Callable|None = self.get_constitutive_equation()
-        if eq != None:
-            raise Exception("Constitutive equation should be None for " + self.get_identifier())
-        in_efforts: list[sp.Function] = [b.get_effort(time_var) for b in self.get_in_bonds()]
-        in_flows: list[sp.Function] = [b.get_flow(time_var) for b in self.get_in_bonds()]
-        out_efforts: list[sp.Function] = [b.get_effort(time_var) for b in self.get_out_bonds()]
-        out_flows: list[sp.Function] = [b.get_flow(time_var) for b in self.get_out_bonds()]
-        equations: list = []
-        # INFO: 0: e_i = e_j, sum(f_in) = sum(f_out)
-        if self.is_common_effort_junction():
-            equations.extend([
-                BondgraphEquation(sp.Equality(sum(in_flows), sum(out_flows))),
-            ])
-            junction_efforts: list[sp.Function] = in_efforts + out_efforts
-            first_effort: sp.Function = junction_efforts[0]
-            for e in junction_efforts[1:]:
-                equations.extend([
-                    BondgraphEquation(sp.Equality(first_effort, e))
-                ])
-        # INFO: 1: f_i = f_j, sum(e_in) = sum(e_out)
-        elif self.is_common_flow_junction():
-            equations.extend([
-                BondgraphEquation(sp.Equality(sum(in_efforts), sum(out_efforts))),
-            ])
-            junction_flows: list[sp.Function] = in_flows + out_flows
-            first_flow: sp.Function = junction_flows[0]
-            for f in junction_flows[1:]:
-                equations.extend([
-                    BondgraphEquation(sp.Equality(first_flow, f)),
-                ])
-        else:
-            raise Exception("Element", self.get_identifier(), "is not a junction.")
-        return equations
+        return in_effort, out_effort, in_flow, out_flow
+
+    @staticmethod
+    def get_measurements(elements: dict[str,Element], time_var: sp.Symbol) -> dict[str,sp.Function]:
+        # Sensor values available to controllers, effort sensors measure effort and flow sensors flow
+        # Effort sensors come first, as controllers have always received them
+        measurements: dict[str,sp.Function] = {
+            ekey: element.get_effort_vars(time_var)[0]
+            for ekey, element in elements.items() if type(element) is EffortSensor
+        }
+        measurements.update({
+            ekey: element.get_flow_vars(time_var)[0]
+            for ekey, element in elements.items() if type(element) is FlowSensor
+        })
+        return measurements
+
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        raise Exception("Unknown element type for", self.get_identifier())
 
-    def get_equations(self, elements: dict[str,Element], time_var: sp.Symbol, tau: sp.Symbol) -> list:
-        if self.is_oneport():
-            return self.__get_oneport_equations(elements, time_var, tau)
-        elif self.is_twoport():
-            return self.__get_twoport_equations(time_var)
-        elif self.is_junction():
-            return self.__get_junction_equations(time_var)
-        else:
-            raise Exception("Unknown element type for", self.get_identifier())
+    def get_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None = None,
+    ) -> list:
+        # Callers building equations of many elements should compute the measurements once
+        if measurements == None and self.is_controller():
+            measurements = Element.get_measurements(elements, time_var)
+        # Every concrete element builds its own equations, no type dispatch needed here
+        return self._build_equations(elements, time_var, tau, measurements)
 
 
 class Capacitance(Element):
+    __slots__ = ()
+    _is_capacitance = True
+    _is_storage = True
+    _is_oneport = True
+
     def __init__(self, identifier: str, constitutive_equation: Callable, initial_value: float):
         super().__init__(
             identifier,
@@ -531,7 +391,53 @@ class Capacitance(Element):
             initial_value=initial_value
         )
 
+    # INFO: C : q(t) = phi_C(e(t)), d/dt q = f(t)
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        bond: Bond = self.get_bonds()[0]
+        effort: sp.Function = bond.get_effort(time_var)
+        flow: sp.Function = bond.get_flow(time_var)
+        displacement: sp.Function = bond.get_displacement(time_var)
+        init_val: float|None = self.get_initial_value()
+        if init_val == None:
+            raise Exception("Initial value should not be none for", self.get_identifier())
+        disp_func = bond.get_displacement()
+        if self.is_effort_input(bond):
+            sols = self._solve_constitutive_equation(effort, displacement, displacement)
+            res = sols[0]
+            return [
+                BondgraphEquation(sp.Equality(res, displacement)),
+                BondgraphEquation(
+                    sp.Equality(sp.diff(displacement), flow),
+                    initial_values = { disp_func(0): init_val },
+                ),
+            ]
+        else:
+            flow_func: sp.Function = bond.get_flow()
+            sols = self._solve_constitutive_equation(effort, displacement, effort)
+            res = sols[0]
+            return [
+                BondgraphEquation(sp.Equality(res, effort)),
+                BondgraphEquation(
+                    sp.Equality(
+                        sp.integrate(flow_func(tau), (tau, 0, time_var)) + init_val,
+                        displacement
+                    ),
+                    initial_values = { disp_func(0): init_val }
+                ),
+            ]
+
 class Inertance(Element):
+    __slots__ = ()
+    _is_inertance = True
+    _is_storage = True
+    _is_oneport = True
+
     def __init__(self, identifier: str, constitutive_equation: Callable, initial_value: float):
         super().__init__(
             identifier,
@@ -539,7 +445,55 @@ class Inertance(Element):
             initial_value=initial_value
         )
 
+    # INFO: I : p(t) = phi_I(f(t)), d/dt p = e(t)
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        bond: Bond = self.get_bonds()[0]
+        effort: sp.Function = bond.get_effort(time_var)
+        flow: sp.Function = bond.get_flow(time_var)
+        momentum: sp.Function = bond.get_momentum(time_var)
+        init_val: float|None = self.get_initial_value()
+        if init_val == None:
+            raise Exception("Initial value should not be none for", self.get_identifier())
+        mom_func: sp.Function = bond.get_momentum()
+        if self.is_effort_input(bond):
+            effort_func: sp.Function = bond.get_effort()
+            sols: list = self._solve_constitutive_equation(flow, momentum, flow)
+            res = sols[0]
+            return [
+                BondgraphEquation(sp.Equality(res, flow)),
+                BondgraphEquation(
+                    sp.Equality(
+                        sp.integrate(effort_func(tau), (tau, 0, time_var)) + init_val,
+                        momentum
+                    ),
+                    initial_values = { mom_func(0): init_val }
+                ),
+            ]
+        else:
+            sols: list = self._solve_constitutive_equation(flow, momentum, momentum)
+            if len(sols) > 0:
+                res = sols[0]
+            else:
+                res = momentum
+            return [
+                BondgraphEquation(sp.Equality(res, momentum)),
+                BondgraphEquation(
+                    sp.Equality(sp.diff(momentum), effort),
+                    initial_values = { mom_func(0): init_val }
+                ),
+            ]
+
 class Resistance(Element):
+    __slots__ = ()
+    _is_resistance = True
+    _is_oneport = True
+
     def __init__(self, identifier: str, constitutive_equation: Callable):
         super().__init__(
             identifier,
@@ -547,7 +501,34 @@ class Resistance(Element):
             initial_value=None
         )
 
+    # INFO: R : e(t) = phi_R(f(t))
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        bond: Bond = self.get_bonds()[0]
+        effort: sp.Function = bond.get_effort(time_var)
+        flow: sp.Function = bond.get_flow(time_var)
+        if self.is_effort_input(bond):
+            res = self._solve_constitutive_equation(effort, flow, flow)[0]
+            return [
+                BondgraphEquation(sp.Equality(res, flow)),
+            ]
+        else:
+            res = self._solve_constitutive_equation(effort, flow, effort)[0]
+            return [
+                BondgraphEquation(sp.Equality(res, effort)),
+            ]
+
 class EffortSource(Element):
+    __slots__ = ()
+    _is_effort_source = True
+    _is_source = True
+    _is_oneport = True
+
     def __init__(self, identifier: str, constitutive_equation: Callable):
         super().__init__(
             identifier,
@@ -555,7 +536,26 @@ class EffortSource(Element):
             initial_value=None
         )
 
+    # INFO: Se : e(t) = h(t)
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        eq: Callable|None = self.get_constitutive_equation()
+        effort: sp.Function = self.get_bonds()[0].get_effort(time_var)
+        return [
+            BondgraphEquation(sp.Equality(eq(time_var), effort)),
+        ]
+
 class FlowSource(Element):
+    __slots__ = ()
+    _is_flow_source = True
+    _is_source = True
+    _is_oneport = True
+
     def __init__(self, identifier: str, constitutive_equation: Callable):
         super().__init__(
             identifier,
@@ -563,7 +563,26 @@ class FlowSource(Element):
             initial_value=None
         )
 
+    # INFO: Sf : f(t) = g(t)
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        eq: Callable|None = self.get_constitutive_equation()
+        flow: sp.Function = self.get_bonds()[0].get_flow(time_var)
+        return [
+            BondgraphEquation(sp.Equality(eq(time_var), flow)),
+        ]
+
 class EffortSensor(Element):
+    __slots__ = ()
+    _is_effort_sensor = True
+    _is_sensor = True
+    _is_oneport = True
+
     def __init__(self, identifier: str):
         super().__init__(
             identifier,
@@ -571,7 +590,25 @@ class EffortSensor(Element):
             initial_value=None
         )
 
+    # INFO: De : f(t) = 0
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        flow: sp.Function = self.get_bonds()[0].get_flow(time_var)
+        return [
+            BondgraphEquation(sp.Equality(0, flow)),
+        ]
+
 class FlowSensor(Element):
+    __slots__ = ()
+    _is_flow_sensor = True
+    _is_sensor = True
+    _is_oneport = True
+
     def __init__(self, identifier: str):
         super().__init__(
             identifier,
@@ -579,7 +616,25 @@ class FlowSensor(Element):
             initial_value=None
         )
 
+    # INFO: Df : e(t) = 0
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        effort: sp.Function = self.get_bonds()[0].get_effort(time_var)
+        return [
+            BondgraphEquation(sp.Equality(0, effort)),
+        ]
+
 class EffortController(Element):
+    __slots__ = ()
+    _is_effort_controller = True
+    _is_controller = True
+    _is_oneport = True
+
     def __init__(self, identifier: str, constitutive_equation: Callable):
         super().__init__(
             identifier,
@@ -587,7 +642,28 @@ class EffortController(Element):
             initial_value=None
         )
 
+    # INFO: Ge : e(t) = f(y,t)
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        eq: Callable|None = self.get_constitutive_equation()
+        effort: sp.Function = self.get_bonds()[0].get_effort(time_var)
+        return [
+            BondgraphEquation(
+                sp.Equality(eq(time_var, measurements), effort),
+            ),
+        ]
+
 class FlowController(Element):
+    __slots__ = ()
+    _is_flow_controller = True
+    _is_controller = True
+    _is_oneport = True
+
     def __init__(self, identifier: str, constitutive_equation: Callable):
         super().__init__(
             identifier,
@@ -595,7 +671,27 @@ class FlowController(Element):
             initial_value=None
         )
 
+    # INFO: Gf : f(t) = f(y,t)
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        eq: Callable|None = self.get_constitutive_equation()
+        flow: sp.Function = self.get_bonds()[0].get_flow(time_var)
+        return [
+            BondgraphEquation(
+                sp.Equality(eq(time_var, measurements), flow),
+            ),
+        ]
+
 class Transformer(Element):
+    __slots__ = ()
+    _is_transformer = True
+    _is_twoport = True
+
     def __init__(self, identifier: str, constitutive_equation: Callable):
         super().__init__(
             identifier,
@@ -603,7 +699,27 @@ class Transformer(Element):
             initial_value=None
         )
 
+    # INFO: TF : e_out - phi_TF(e_in(t)) = 0, f_in - phi_TF(f_out)
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        in_effort, out_effort, in_flow, out_flow = self._get_twoport_powers(time_var)
+        eff_res = self._solve_constitutive_equation(in_effort, out_effort, out_effort)[0]
+        flow_res = self._solve_constitutive_equation(in_flow, out_flow, out_flow)[0]
+        return [
+            BondgraphEquation(sp.Equality(out_effort, eff_res)),
+            BondgraphEquation(sp.Equality(out_flow, flow_res)),
+        ]
+
 class Gyrator(Element):
+    __slots__ = ()
+    _is_gyrator = True
+    _is_twoport = True
+
     def __init__(self, identifier: str, constitutive_equation: Callable):
         super().__init__(
             identifier,
@@ -611,24 +727,26 @@ class Gyrator(Element):
             initial_value=None
         )
 
-class CommonFlowJunction(Element):
-    def is_active(self) -> bool:
-        return self.__is_active
-
-    def activate(self):
-        if not self.__is_controlled:
-            raise Exception("Trying to change active state of non-controlled junction" + self.__identifier)
-        self.__is_active = True
-
-    def deactivate(self):
-        if not self.__is_controlled:
-            raise Exception("Trying to change active state of non-controlled junction" + self.__identifier)
-        self.__is_active = False
+    # INFO: GY : e_in(t) = phi_GY(f_out(t)), e_out(t) = phy_GY(f_in(t))
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        in_effort, out_effort, in_flow, out_flow = self._get_twoport_powers(time_var)
+        eff_res = self._solve_constitutive_equation(in_effort, out_flow, out_flow)[0]
+        flow_res = self._solve_constitutive_equation(out_effort, in_flow, out_effort)[0]
+        return [
+            BondgraphEquation(sp.Equality(out_flow, eff_res)),
+            BondgraphEquation(sp.Equality(out_effort, flow_res)),
+        ]
 
-    def toggle(self):
-        if not self.__is_controlled:
-            raise Exception("Trying to change active state of non-controlled junction" + self.__identifier)
-        self.__is_active = not self.__is_active
+class _JunctionBase(Element):
+    # Common effort (0) and common flow (1) junctions only differ in which power variable is shared
+    __slots__ = ("__is_controlled", "__is_active")
+    _is_junction = True
 
     def __init__(self, identifier: str, is_controlled=False):
         self.__is_controlled: bool = is_controlled
@@ -639,30 +757,57 @@ class CommonFlowJunction(Element):
             initial_value=None
         )
 
-class CommonEffortJunction(Element):
     def is_active(self) -> bool:
         return self.__is_active
 
     def activate(self):
         if not self.__is_controlled:
-            raise Exception("Trying to change active state of non-controlled junction" + self.__identifier)
+            raise Exception("Trying to change active state of non-controlled junction " + self.get_identifier())
         self.__is_active = True
 
     def deactivate(self):
         if not self.__is_controlled:
-            raise Exception("Trying to change active state of non-controlled junction" + self.__identifier)
+            raise Exception("Trying to change active state of non-controlled junction " + self.get_identifier())
         self.__is_active = False
 
     def toggle(self):
         if not self.__is_controlled:
-            raise Exception("Trying to change active state of non-controlled junction" + self.__identifier)
+            raise Exception("Trying to change active state of non-controlled junction " + self.get_identifier())
         self.__is_active = not self.__is_active
 
-    def __init__(self, identifier: str, is_controlled=False):
-        self.__is_controlled: bool = is_controlled
-        self.__is_active: bool = True
-        super().__init__(
-            identifier,
-            constitutive_equation=None,
-            initial_value=None
-        )
+    # INFO: 0: e_i = e_j, sum(f_in) = sum(f_out)
+    # INFO: 1: f_i = f_j, sum(e_in) = sum(e_out)
+    def _build_equations(
+        self,
+        elements: dict[str,Element],
+        time_var: sp.Symbol,
+        tau: sp.Symbol,
+        measurements: dict[str,sp.Function]|None,
+    ) -> list:
+        if self.get_constitutive_equation() != None:
+            raise Exception("Constitutive equation should be None for " + self.get_identifier())
+        in_efforts: list[sp.Function] = [b.get_effort(time_var) for b in self.get_in_bonds()]
+        in_flows: list[sp.Function] = [b.get_flow(time_var) for b in self.get_in_bonds()]
+        out_efforts: list[sp.Function] = [b.get_effort(time_var) for b in self.get_out_bonds()]
+        out_flows: list[sp.Function] = [b.get_flow(time_var) for b in self.get_out_bonds()]
+        if self._is_common_effort_junction:
+            junction_vars: list[sp.Function] = in_efforts + out_efforts
+            in_sum: sp.Expr = sp.Add(*in_flows)
+            out_sum: sp.Expr = sp.Add(*out_flows)
+        else:
+            junction_vars: list[sp.Function] = in_flows + out_flows
+            in_sum: sp.Expr = sp.Add(*in_efforts)
+            out_sum: sp.Expr = sp.Add(*out_efforts)
+        first_var: sp.Function = junction_vars[0]
+        return [
+            BondgraphEquation(sp.Equality(in_sum, out_sum)),
+            *[BondgraphEquation(sp.Equality(first_var, v)) for v in junction_vars[1:]],
+        ]
+
+class CommonFlowJunction(_JunctionBase):
+    __slots__ = ()
+    _is_common_flow_junction = True
+
+class CommonEffortJunction(_JunctionBase):
+    __slots__ = ()
+    _is_common_effort_junction = True
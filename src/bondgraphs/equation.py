@@ -1,5 +1,6 @@
 from __future__ import annotations
 class BondgraphEquation():
+    __slots__ = ("__equation", "__initial_values")
 
     def __init__(self, equation, initial_values: dict = {}):
         self.__equation = equation
@@ -1,16 +1,87 @@
 from __future__ import annotations
 from .equation import BondgraphEquation
 
+import functools
+from typing import Callable
 import sympy as sp
+from sympy.core.function import AppliedUndef
+from sympy.utilities.autowrap import autowrap
+from sympy.utilities.codegen import C99CodeGen
+
+
+@functools.lru_cache(maxsize=128)
+def _solve_equations(equations: tuple, symbols: tuple = ()) -> list[dict]:
+    if len(symbols) == 0:
+        return sp.solve(list(equations), rational=True, dict=True)
+    return sp.solve(list(equations), list(symbols), rational=True, dict=True)
+
+
+@functools.lru_cache(maxsize=128)
+def _cse_equations(equations: tuple) -> tuple[list,list]:
+    return sp.cse(list(equations), symbols=sp.numbered_symbols("_cse", cls=sp.Dummy))
+
+
+@functools.lru_cache(maxsize=128)
+def _dsolve_system(equations: tuple, vars: tuple, time_var: sp.Symbol) -> list:
+    return sp.solvers.ode.systems.dsolve_system(
+        list(equations),
+        list(vars),
+        time_var,
+        # ics=initial_values, # WARN: Does not work because of bug?
+        doit=False,
+        simplify=False,
+    )
+
+
+def _classify(eq) -> tuple[bool,bool]:
+    # Returns (has_integral, has_derivative) from a single traversal of eq
+    atoms: set = eq.atoms(sp.Integral, sp.Derivative)
+    has_integral: bool = any(isinstance(a, sp.Integral) for a in atoms)
+    has_derivative: bool = any(isinstance(a, sp.Derivative) for a in atoms)
+    return has_integral, has_derivative
+
+
+def _write_log(log: bool, log_lines: list[str]|None, *args):
+    # Printed lines are also recorded, so a log can be shown again for memoized solutions
+    line: str = " ".join(str(arg) for arg in args)
+    if log_lines != None:
+        log_lines.append(line)
+    if log:
+        print(line)
+
 
 class Solver():
 
+    @staticmethod
+    def get_explicit_solution(equations: list) -> dict|None:
+        # Equations of the form var = expr where no var occurs in any expr need no solving
+        solution: dict = {}
+        for eq in equations:
+            if not isinstance(eq, sp.Equality):
+                return None
+            if isinstance(eq.lhs, AppliedUndef) and not eq.rhs.has(eq.lhs):
+                var, expr = eq.lhs, eq.rhs
+            elif isinstance(eq.rhs, AppliedUndef) and not eq.lhs.has(eq.rhs):
+                var, expr = eq.rhs, eq.lhs
+            else:
+                return None
+            if var in solution:
+                return None
+            solution[var] = sp.nsimplify(expr, rational=True)
+        defined_vars: list = list(solution.keys())
+        for var in solution:
+            if solution[var].has(*defined_vars):
+                return None
+        return solution
+
     @staticmethod
     def get_simplified_equations(equations: list) -> list:
-        results: list = sp.solve(equations, rational=True, dict=True)
-        if len(results) == 0:
-            return equations
-        res = results[0]
+        res: dict|None = Solver.get_explicit_solution(equations)
+        if res == None:
+            results: list = _solve_equations(tuple(equations))
+            if len(results) == 0:
+                return equations
+            res = results[0]
         simplified_equations: list = []
         for var in res:
             simplified_equations.append(
@@ -22,18 +93,13 @@ class Solver():
     def get_initial_equations(
         equations: list,
         time_var: sp.Symbol,
-        tau: sp.Symbol,
     ) -> list:
         initial_equations: list = []
         for eq in equations:
-            if eq.has(sp.Derivative):
-                e = sp.integrate(
-                    eq.subs(time_var, tau),
-                    (tau, 0, time_var)
-                )
-            else:
-                e = eq
-            res = e.subs(time_var, 0).doit()
+            # INFO: Integrating a derivative equation over [0, t] and evaluating at t=0 always yields 0 = 0
+            if _classify(eq)[1]:
+                continue
+            res = eq.subs(time_var, 0).doit()
             if res != True:
                 initial_equations.append(res)
         return initial_equations
@@ -54,18 +120,44 @@ class Solver():
                 initial_equations.append(
                     sp.Equality(key, sp.nsimplify(ics[key]))
                 )
-        initial_values: dict = sp.solve(initial_equations, initial_vars, rational=True, dict=True)[0]
+        # Solve the reduced system together with the definitions of the common subexpressions
+        replacements, reduced = _cse_equations(tuple(initial_equations))
+        cse_equations: list = [sp.Equality(sym, expr) for (sym, expr) in replacements]
+        cse_symbols: list = [sym for (sym, _) in replacements]
+        solution: dict = _solve_equations(
+            tuple(reduced + cse_equations),
+            tuple(initial_vars + cse_symbols),
+        )[0]
+        back_substitutions: list = list(reversed(replacements))
+        initial_values: dict = {}
+        for var in solution:
+            if var not in cse_symbols:
+                initial_values[var] = solution[var].subs(back_substitutions)
         return initial_values
 
+    @staticmethod
+    def differentiate(expr, time_var: sp.Symbol):
+        # INFO: d/dt c * Integral(g(tau), (tau, a, t)) = c * g(t), if c, g and a do not depend on t
+        derivative = sp.Integer(0)
+        for term in sp.Add.make_args(expr):
+            coeff, rest = term.as_independent(time_var, as_Add=False)
+            if isinstance(rest, sp.Integral) and len(rest.limits) == 1 and len(rest.limits[0]) == 3:
+                int_var, lower, upper = rest.limits[0]
+                if upper == time_var and not lower.has(time_var) and not rest.function.has(time_var):
+                    derivative += coeff * rest.function.subs(int_var, time_var)
+                    continue
+            derivative += sp.Derivative(term, time_var).doit()
+        return derivative
+
     @staticmethod
     def remove_integrals(equations: list, time_var: sp.Symbol) -> list:
         derivative_equations: list = []
         for eq in equations:
-            if eq.has(sp.Integral):
+            if _classify(eq)[0]:
                 try:
                     equal = sp.Equality(
-                        sp.Derivative(eq.lhs, time_var).doit(),
-                        sp.Derivative(eq.rhs, time_var).doit(),
+                        Solver.differentiate(eq.lhs, time_var),
+                        Solver.differentiate(eq.rhs, time_var),
                     )
                     derivative_equations.append(equal)
                 except Exception as exc:
@@ -77,44 +169,60 @@ class Solver():
     @staticmethod
     def has_integrals_or_derivatives(equations: list) -> bool:
         for eq in equations:
-            if eq.has(sp.Integral) or eq.has(sp.Derivative):
+            if any(_classify(eq)):
                 return True
 
         return False
 
+    @staticmethod
+    def get_integration_constants(solution: list, time_var: sp.Symbol) -> dict:
+        equations: list = [
+            sp.nsimplify(dv.subs(time_var, 0).doit(), rational=True) for dv in solution
+        ]
+        free_symbols: set = set()
+        for dv in solution:
+            free_symbols |= dv.free_symbols
+        free_symbols.discard(time_var)
+        constants: list = list(sp.ordered(free_symbols))
+        # Constants of dsolve_system are linear, so a linear solve usually suffices
+        try:
+            A, b = sp.linear_eq_to_matrix(equations, constants)
+            results: list = list(sp.linsolve((A, b), constants))
+        except sp.solvers.solveset.NonlinearError:
+            results = []
+        if len(results) == 1 and not any(r.has(*constants) for r in results[0]):
+            return dict(zip(constants, results[0]))
+        return sp.solve(equations, simplify=False, rational=True)
+
     @staticmethod
     def instantiate_solution(
         solution: dict,
         vars: list,
         initial_values: dict,
         time_var: sp.Symbol,
-        log: bool
+        log: bool,
+        log_lines: list[str]|None = None,
     ) -> dict:
         # Calculate values of constants at t=0 (depend on initial values)
-        constants: dict = sp.solve(
-            [dv.subs(time_var, 0).doit() for dv in solution],
-            simplify=False,
-            rational=True,
-        )
+        constants: dict = Solver.get_integration_constants(solution, time_var)
         subs_constants: dict = {}
         # Substitute initial values in constants
         for c in constants:
             subs_constants[c] = constants[c].subs(initial_values)
         # Substutitute calculated constant values in equations
-        eq_subst: list = [eq.subs(subs_constants).doit() for eq in solution]
-        if log:
-            print("Constants:")
-            for c in constants:
-                print(c, "=", constants[c])
-            print()
-            print("Substituted constants:")
-            for c in subs_constants:
-                print(c, "=", subs_constants[c])
-            print()
-            print("Equations with replaced constants:")
-            for eq in eq_subst:
-                print(eq)
-            print()
+        eq_subst: list = list(sp.Tuple(*solution).subs(subs_constants, simultaneous=True).doit())
+        _write_log(log, log_lines, "Constants:")
+        for c in constants:
+            _write_log(log, log_lines, c, "=", constants[c])
+        _write_log(log, log_lines)
+        _write_log(log, log_lines, "Substituted constants:")
+        for c in subs_constants:
+            _write_log(log, log_lines, c, "=", subs_constants[c])
+        _write_log(log, log_lines)
+        _write_log(log, log_lines, "Equations with replaced constants:")
+        for eq in eq_subst:
+            _write_log(log, log_lines, eq)
+        _write_log(log, log_lines)
         solution = sp.solve(eq_subst, vars, rational=True, dict=True)[0]
         return solution
 
@@ -124,91 +232,81 @@ class Solver():
         vars: list[sp.Function],
         var_funcs: list[sp.Function],
         time_var: sp.Symbol,
-        tau: sp.Symbol,
         log: bool=False,
+        log_lines: list[str]|None = None,
     ) -> list[dict]:
-        if log:
-            print("Variables:")
-            print(vars)
-            print()
+        _write_log(log, log_lines, "Variables:")
+        _write_log(log, log_lines, vars)
+        _write_log(log, log_lines)
 
         equations: list = [e.get_equation() for e in bg_equations]
-        if log:
-            print("Initial Equations:")
-            for eq in equations:
-                print(eq)
-            print()
+        _write_log(log, log_lines, "Initial Equations:")
+        for eq in equations:
+            _write_log(log, log_lines, eq)
+        _write_log(log, log_lines)
 
         simplified_equations: list = Solver.get_simplified_equations(equations)
-        if log:
-            print("Simplified equations:")
-            for eq in simplified_equations:
-                print(eq)
-            print()
+        _write_log(log, log_lines, "Simplified equations:")
+        for eq in simplified_equations:
+            _write_log(log, log_lines, eq)
+        _write_log(log, log_lines)
 
         derivative_equations: list = Solver.remove_integrals(
             simplified_equations,
             time_var,
         )
-        if log:
-            print("Derivative equations:")
-            for de in derivative_equations:
-                print(de)
-            print()
+        _write_log(log, log_lines, "Derivative equations:")
+        for de in derivative_equations:
+            _write_log(log, log_lines, de)
+        _write_log(log, log_lines)
         for eq in derivative_equations:
-            if eq.has(sp.Integral):
+            if _classify(eq)[0]:
                 raise Exception("Integrals still present in derivative equations.")
 
         initial_equations: list = Solver.get_initial_equations(
             equations,
             time_var,
-            tau
         )
-        if log:
-            print("Initial value equations:")
-            for eq in initial_equations:
-                print(eq)
-            print()
+        _write_log(log, log_lines, "Initial value equations:")
+        for eq in initial_equations:
+            _write_log(log, log_lines, eq)
+        _write_log(log, log_lines)
 
         initial_values: dict = Solver.get_initial_values(
             bg_equations,
             initial_equations,
             var_funcs,
         )
-        if log:
-            print("Initial values:")
-            for var in initial_values:
-                print(var, "=", initial_values[var])
-            print()
+        _write_log(log, log_lines, "Initial values:")
+        for var in initial_values:
+            _write_log(log, log_lines, var, "=", initial_values[var])
+        _write_log(log, log_lines)
         if len(initial_values) == 0:
             raise Exception("Contradiction in initial values")
 
         # Directly solve algebraically, if no derivatives or integrals
         if not Solver.has_integrals_or_derivatives(derivative_equations):
             solutions: list[dict] = sp.solve(derivative_equations, vars, dict=True, rational=True)
-            print("No storage element present")
+            _write_log(True, log_lines, "No storage element present")
             for idx, sol in enumerate(solutions):
-                print("Solution", idx)
+                _write_log(True, log_lines, "Solution", idx)
                 for var in sol:
-                    print(var, "=", sol[var])
+                    _write_log(True, log_lines, var, "=", sol[var])
             return solutions
 
         # Solve system of ODE's
-        derivative_solutions: list = sp.solvers.ode.systems.dsolve_system(
-            derivative_equations,
-            vars,
+        # INFO: Initial values are not part of the derivative equations, so changing them hits the cache
+        derivative_solutions: list = _dsolve_system(
+            tuple(derivative_equations),
+            tuple(vars),
             time_var,
-            # ics=initial_values, # WARN: Does not work because of bug?
-            doit=False,
-            simplify=False,
         )
-        if log:
-            print("Solved derivative solutions:")
-            for idx, sol in enumerate(derivative_solutions):
-                print("Solution", idx)
-                for eq in sol:
-                    print(eq)
-            print()
+        _write_log(log, log_lines, "Solved derivative solutions:")
+        for idx, sol in enumerate(derivative_solutions):
+            _write_log(log, log_lines, "Solution", idx)
+            for eq in sol:
+                _write_log(log, log_lines, eq)
+        _write_log(log, log_lines)
 
         # Create final solutions
         solutions: list[dict] = []
@@ -219,14 +317,60 @@ class Solver():
                 initial_values,
                 time_var,
                 log,
+                log_lines,
             )
             solutions.append(solution)
-        if log:
-            print("Solutions:")
-            for idx, sol in enumerate(solutions):
-                print("Solution", idx)
-                for var in sol:
-                    print(var, "=", sol[var])
-            print()
+        _write_log(log, log_lines, "Solutions:")
+        for idx, sol in enumerate(solutions):
+            _write_log(log, log_lines, "Solution", idx)
+            for var in sol:
+                _write_log(log, log_lines, var, "=", sol[var])
+        _write_log(log, log_lines)
 
         return solutions
+
+    @staticmethod
+    def compile_solution(
+        solution: dict,
+        vars: list,
+        time_var: sp.Symbol,
+        params: list[sp.Symbol] = [],
+        backend: str = "numpy",
+    ) -> Callable:
+        # Returned function maps (t, *params) to the values of vars, in the given order
+        rhs_exprs: tuple = tuple(solution[var] for var in vars)
+        if backend == "symengine":
+            # WARN: symengine is optional, its C++ core evaluates the expressions without numpy lambdify
+            import symengine
+            return symengine.Lambdify(
+                [time_var, *params],
+                [symengine.sympify(expr) for expr in rhs_exprs],
+                cse=True,
+            )
+        func: Callable = sp.lambdify((time_var, *params), rhs_exprs, modules="numpy", cse=True)
+        if backend == "numba":
+            # WARN: numba is optional and cannot cache lambdified functions on disk
+            import numba
+            func = numba.njit(func)
+        elif backend != "numpy":
+            raise Exception("Unknown backend " + backend + ".")
+        return func
+
+    @staticmethod
+    def export_c(
+        solution: dict,
+        vars: list,
+        time_var: sp.Symbol,
+        params: list[sp.Symbol] = [],
+        tempdir: str|None = None,
+    ) -> Callable:
+        # WARN: Needs Cython and a C compiler, solutions must not contain unevaluated integrals
+        # Returned function maps (t, *params) to a column array of the values of vars
+        rhs_exprs: sp.Matrix = sp.Matrix([solution[var] for var in vars])
+        return autowrap(
+            rhs_exprs,
+            backend="cython",
+            args=[time_var, *params],
+            tempdir=tempdir,
+            code_gen=C99CodeGen("autowrap", cse=True),
+        )
@@ -1,7 +1,9 @@
 from __future__ import annotations
 import networkx as nx
+import numpy as np
 import sympy as sp
 import matplotlib.pyplot as plt
+import matplotlib.transforms as transforms
 
 from .bond import Bond
 from .equation import BondgraphEquation
@@ -13,6 +15,11 @@ plt.rcParams["mathtext.fontset"] = "dejavuserif"
 class BondgraphViewer():
     TITLE_FONT_SIZE = 18
     FONT_SIZE = 14
+    LATEX_LINE_SPACING = 1.8
+    LARGE_GRAPH_NODE_NUMBER = 100
+    NODE_RADIUS = 16
+    # Simulation figures by name, with the plotted variable names, lines and canvas callback ids
+    __simulation_figures: dict[str,tuple[list[str],list,list[int]]] = {}
 
     def get_node_ids(self) -> list[str]:
         raise NotImplementedError
@@ -41,7 +48,7 @@ class BondgraphViewer():
         step_number: int,
         step_size: float,
         variables: list[sp.Function],
-    ) -> dict[str,list[float]]:
+    ) -> dict[str,np.ndarray]:
         raise NotImplementedError
 
     @staticmethod
@@ -52,125 +59,146 @@ class BondgraphViewer():
         return graph
 
     @staticmethod
-    def __draw_nodes(graph: nx.DiGraph, node_ids: list[str], positioning: dict):
-        options: dict = {}
-        nx.draw_networkx_nodes(
-            graph,
-            pos = positioning,
-            nodelist = node_ids,
-            node_size = 1000,
-            node_color = "black",
-            alpha = 0.0,
-            **options
-        )
-
-    @staticmethod
-    def __draw_node_labels(graph: nx.DiGraph, node_ids: list[str], positioning: dict):
-        node_labels = {}
+    def __draw_node_labels(axes, node_ids: list[str], positioning: dict):
         for name in node_ids:
-            node_labels[name] = r"$" + name + "$"
-        nx.draw_networkx_labels(
-            graph,
-            pos = positioning,
-            labels = node_labels,
-            font_size = 13,
-            font_color = "black",
-        )
+            x, y = positioning[name]
+            axes.text(
+                x,
+                y,
+                r"$" + name + "$",
+                fontsize = 13,
+                color = "black",
+                horizontalalignment = "center",
+                verticalalignment = "center",
+            )
 
     @staticmethod
     def __draw_edges(
-        graph: nx.DiGraph,
+        axes,
         edges: list[tuple[int,tuple[str,str]]],
         positioning: dict,
         arrowstyle: str
     ):
-        nx.draw_networkx_edges(
-            graph,
-            pos = positioning,
-            edgelist = [edge for (_, edge) in edges],
-            width = 1,
-            alpha = 1.0,
-            edge_color = "black",
-            arrowsize = 10,
+        # Arrows end short of the (invisible) nodes, so they do not run into node labels
+        arrowprops: dict = dict(
             arrowstyle = arrowstyle,
+            color = "black",
+            linewidth = 1,
+            mutation_scale = 10,
+            shrinkA = BondgraphViewer.NODE_RADIUS,
+            shrinkB = BondgraphViewer.NODE_RADIUS,
         )
+        for (_, (start, end)) in edges:
+            axes.annotate("", xy=positioning[end], xytext=positioning[start], arrowprops=arrowprops, zorder=1)
 
     @staticmethod
-    def __draw_edge_labels(graph: nx.DiGraph, edges: list[tuple[int,tuple[str,str]]], positioning: dict):
-        edge_labels = {}
-        for idx, edge in edges:
-            edge_labels[edge] = r"$(f_{" + str(idx) + "}," + "e_{" + str(idx) + "})$"
-        nx.draw_networkx_edge_labels(
-            graph,
-            pos = positioning,
-            edge_labels = edge_labels,
-            verticalalignment = "baseline",
-            rotate = False,
-        )
+    def __draw_edge_labels(axes, edges: list[tuple[int,tuple[str,str]]], positioning: dict):
+        bbox: dict = dict(boxstyle="round", edgecolor="white", facecolor="white")
+        for idx, (start, end) in edges:
+            (x_start, y_start), (x_end, y_end) = positioning[start], positioning[end]
+            axes.text(
+                (x_start + x_end) / 2,
+                (y_start + y_end) / 2,
+                r"$(f_{" + str(idx) + "}," + "e_{" + str(idx) + "})$",
+                horizontalalignment = "center",
+                verticalalignment = "baseline",
+                bbox = bbox,
+                zorder = 1,
+            )
 
-    def draw_graph(self):
+    @staticmethod
+    def __layout_graph(graph: nx.DiGraph, layout: str|None) -> dict:
+        match layout:
+            case None:
+                # Prefer a planar layout, fall back to cheap layouts for large or non-planar graphs
+                if graph.number_of_nodes() > BondgraphViewer.LARGE_GRAPH_NODE_NUMBER:
+                    return nx.spring_layout(graph, iterations=50)
+                try:
+                    return nx.planar_layout(graph)
+                except nx.NetworkXException:
+                    return nx.spectral_layout(graph)
+            case "planar":
+                return nx.planar_layout(graph)
+            case "spectral":
+                return nx.spectral_layout(graph)
+            case "spring":
+                return nx.spring_layout(graph, iterations=50)
+            case "shell":
+                return nx.shell_layout(graph)
+            case _:
+                raise Exception("Unknown layout " + layout + ".")
+
+    def draw_graph(self, layout: str|None = None):
         node_ids: list[str] = self.get_node_ids()
         bonds: list[Bond] = self.get_bonds()
-        edges: list[tuple[int,tuple[str,str]]] = [
-            (bond.get_index(), (bond.get_start(), bond.get_end())) for bond in bonds
-        ]
-        graph: nx.DiGraph = self.__create_graph(node_ids, edges)
-        positioning: dict = nx.planar_layout(graph)
-        scaled_positioning: dict = nx.rescale_layout_dict(positioning, scale=1)
-        title: str = "Bond Graph"
-        plt.figure(self.get_name() + " - " + title)
-        plt.title(title, fontsize=self.TITLE_FONT_SIZE, fontweight="bold")
-        self.__draw_nodes(graph, node_ids, scaled_positioning)
-        self.__draw_node_labels(graph, node_ids, scaled_positioning)
+        edges: list[tuple[int,tuple[str,str]]] = []
         causalities: list[tuple[int,tuple[str,str]]] = []
         for bond in bonds:
+            idx: int = bond.get_index()
             dir: tuple[str,str]|None = bond.get_effort_causality_direction()
             if dir == None:
-                raise Exception("Causality has not been assigned ")
-            causalities.append((bond.get_index(), dir))
-        self.__draw_edges(graph, edges, scaled_positioning, "->")
-        self.__draw_edges(graph, causalities, scaled_positioning, "-[")
-        self.__draw_edge_labels(graph, edges, scaled_positioning)
-
-    def __draw_latex(self, title: str, latex_text: str):
-        if "\\cases" in latex_text:
+                raise Exception("Causality has not been assigned for bond " + str(idx) + ".")
+            edges.append((idx, bond.get_edge()))
+            causalities.append((idx, dir))
+        graph: nx.DiGraph = self.__create_graph(node_ids, edges)
+        positioning: dict = self.__layout_graph(graph, layout)
+        title: str = "Bond Graph"
+        plt.figure(self.get_name() + " - " + title, clear=True)
+        plt.title(title, fontsize=self.TITLE_FONT_SIZE, fontweight="bold")
+        axes = plt.gca()
+        # Annotations do not take part in autoscaling, so the node positions are registered explicitly
+        axes.update_datalim(np.array(list(positioning.values())))
+        axes.autoscale_view()
+        axes.tick_params(which="both", bottom=False, left=False, labelbottom=False, labelleft=False)
+        self.__draw_node_labels(axes, node_ids, positioning)
+        self.__draw_edges(axes, edges, positioning, "->")
+        self.__draw_edges(axes, causalities, positioning, "-[")
+        self.__draw_edge_labels(axes, edges, positioning)
+
+    def __draw_latex(self, title: str, latex_lines: list[str]):
+        if any("\\cases" in line for line in latex_lines):
             print("Latex code contains non-representable things.")
             return
-        plt.figure(self.get_name() + " - " + title)
+        figure = plt.figure(self.get_name() + " - " + title, clear=True)
         plt.title(title, fontsize=self.TITLE_FONT_SIZE, fontweight="bold")
-        # \limits is not printable by matplotlib (other things as well)
-        latex_text = latex_text.replace("\\limits", "")
-        latex_text = latex_text.replace("\\right", "")
-        latex_text = latex_text.replace("\\left", "")
-        x_position: float = 0.5
-        y_position: float = 0.5
-        plt.text(
-            x_position,
-            y_position,
-            latex_text,
-            horizontalalignment="center",
-            verticalalignment="center",
-            fontsize=self.FONT_SIZE,
-            linespacing=1.8,
-        )
+        axes = plt.gca()
+        # Lines are stepped in points, the figure grows until all of them fit into the axes
+        line_height: float = self.LATEX_LINE_SPACING * self.FONT_SIZE
+        needed_height: float = (len(latex_lines) + 1) * line_height / 72.0 / axes.get_position().height
+        width, height = figure.get_size_inches()
+        if needed_height > height:
+            figure.set_size_inches(width, needed_height)
+        # One text per equation, so matplotlib caches each parsed expression separately
+        for i, line in enumerate(latex_lines):
+            # \limits is not printable by matplotlib (other things as well)
+            line = line.replace("\\limits", "")
+            line = line.replace("\\right", "")
+            line = line.replace("\\left", "")
+            plt.text(
+                0.5,
+                1.0,
+                line,
+                transform=transforms.offset_copy(
+                    axes.transAxes,
+                    fig=figure,
+                    y=-(i + 1) * line_height,
+                    units="points",
+                ),
+                horizontalalignment="center",
+                verticalalignment="center",
+                fontsize=self.FONT_SIZE,
+            )
         plt.axis("off")
 
     def draw_equations(self):
-        latex_str: str = ""
         element_equations: list[BondgraphEquation] = self.get_equations()
-        for el_eq in element_equations:
-            equation = el_eq.get_equation()
-            equation_str: str = sp.latex(equation)
-            latex_str: str = latex_str + (rf"${equation_str}$" + "\n")
-        self.__draw_latex("Equations", latex_str)
+        latex_lines: list[str] = [rf"${sp.latex(el_eq.get_equation())}$" for el_eq in element_equations]
+        self.__draw_latex("Equations", latex_lines)
 
     def draw_solution(self, solution_nr: int = 0):
-        latex_str: str = ""
         solution = self.get_solutions(log=True)[solution_nr]
-        for var in solution:
-            equation_str: str = sp.latex(var) + "=" + sp.latex(solution[var])
-            latex_str: str = latex_str + (rf"${equation_str}$" + "\n")
-        self.__draw_latex("Solutions", latex_str)
+        latex_lines: list[str] = [rf"${sp.latex(var)}={sp.latex(solution[var])}$" for var in solution]
+        self.__draw_latex("Solutions", latex_lines)
 
     def draw_simulation(
         self,
@@ -180,7 +208,7 @@ class BondgraphViewer():
         variables: list[sp.Function],
         solution_nr: int = 0
     ):
-        data_sets: dict[str,list[float]] = self.simulate(
+        data_sets: dict[str,np.ndarray] = self.simulate(
             start_time,
             step_number,
             step_size,
@@ -188,16 +216,36 @@ class BondgraphViewer():
             solution_nr=solution_nr,
         )
         title: str = "Simulation Results"
-        figure = plt.figure(self.get_name() + " - " + title)
+        figure_name: str = self.get_name() + " - " + title
+        var_names: list[str] = [str(var) for var in variables]
+        if figure_name in BondgraphViewer.__simulation_figures and plt.fignum_exists(figure_name):
+            plotted_names, plotted_lines, callback_ids = BondgraphViewer.__simulation_figures[figure_name]
+            figure = plt.figure(figure_name)
+            if plotted_names == var_names:
+                # Same variables as before, so only the data of the existing lines is replaced
+                for line, var_name in zip(plotted_lines, var_names):
+                    line.set_data(data_sets["t"], data_sets[var_name])
+                axes = figure.gca()
+                axes.relim()
+                axes.autoscale_view()
+                figure.canvas.draw_idle()
+                return
+            for callback_id in callback_ids:
+                figure.canvas.mpl_disconnect(callback_id)
+        figure = plt.figure(figure_name, clear=True)
         plt.title(title, fontsize=self.TITLE_FONT_SIZE, fontweight="bold")
         plt.grid(visible=True, which="major", axis="both")
+        axes = plt.gca()
         lines = []
-        for var in variables:
-            var_name: str = str(var)
-            line, = plt.plot(data_sets["t"], data_sets[var_name], label= r"$" + var_name + r"$")
+        for var_name in var_names:
+            # Animated lines are left out of full redraws and blitted on top of a cached background
+            line, = plt.plot(data_sets["t"], data_sets[var_name], label= r"$" + var_name + r"$", animated=True)
             lines.append(line)
         plt.xlabel("t [s]")
         legend = plt.legend()
+        legend.set_animated(True)
+        animated_artists: list = lines + [legend]
+        background: dict = {}
         legend_lines: list = legend.get_lines()
         line_dict = {}
         for legend_line, original_line in zip(legend_lines, lines):
@@ -214,8 +262,23 @@ class BondgraphViewer():
                 legend_line.set_alpha(1.0)
             else:
                 legend_line.set_alpha(0.2)
-            figure.canvas.draw()
-        figure.canvas.mpl_connect("pick_event", onpick)
+            if "axes" not in background:
+                figure.canvas.draw_idle()
+                return
+            figure.canvas.restore_region(background["axes"])
+            for artist in animated_artists:
+                axes.draw_artist(artist)
+            figure.canvas.blit(axes.bbox)
+        def ondraw(event):
+            if figure.canvas.supports_blit:
+                background["axes"] = figure.canvas.copy_from_bbox(axes.bbox)
+            for artist in animated_artists:
+                artist.draw(event.renderer)
+        callback_ids: list[int] = [
+            figure.canvas.mpl_connect("pick_event", onpick),
+            figure.canvas.mpl_connect("draw_event", ondraw),
+        ]
+        BondgraphViewer.__simulation_figures[figure_name] = (var_names, lines, callback_ids)
 
     def show(self):
         plt.show()
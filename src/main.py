@@ -1,12 +1,24 @@
-import inspect
+from typing import Callable
 
 import sympy as sp
 import bondgraphs as bg
 
 
+# Examples by name, filled at import time by the register decorator
+EXAMPLES: dict[str,Callable[[],bg.DirectedBondgraph]] = {}
+
+
+def register(examples: dict[str,Callable[[],bg.DirectedBondgraph]]):
+    def decorator(method: Callable[[],bg.DirectedBondgraph]) -> Callable[[],bg.DirectedBondgraph]:
+        examples[method.__name__] = method
+        return method
+    return decorator
+
+
 class Examples():
 
     @staticmethod
+    @register(EXAMPLES)
     def simple_example() -> bg.DirectedBondgraph:
         elements: list[bg.Element] = [
             bg.FlowSource("S_f", lambda _: 2),
@@ -22,6 +34,7 @@ class Examples():
         return bg.DirectedBondgraph("Simple Electrical Circuit", elements, bonds)
 
     @staticmethod
+    @register(EXAMPLES)
     def rc() -> bg.DirectedBondgraph:
         elements: list[bg.Element] = [
             bg.Capacitance("C", lambda e, q: 1 * e - q, initial_value=2),
@@ -35,6 +48,7 @@ class Examples():
         return bg.DirectedBondgraph("Simple Electrical Circuit", elements, bonds)
 
     @staticmethod
+    @register(EXAMPLES)
     def moving_body() -> bg.DirectedBondgraph:
         elements: list[bg.Element] = [
             bg.Inertance("I", lambda f, p: p - 2 * f, initial_value=0), # Mass = 2
@@ -48,6 +62,7 @@ class Examples():
         return bg.DirectedBondgraph("Simple Moving Body", elements, bonds)
 
     @staticmethod
+    @register(EXAMPLES)
     def moving_body_controller() -> bg.DirectedBondgraph:
         mass = 2
         setpoint = 10
@@ -68,6 +83,7 @@ class Examples():
         return bg.DirectedBondgraph("Moving Body Controller", elements, bonds)
 
     @staticmethod
+    @register(EXAMPLES)
     def spring_damper() -> bg.DirectedBondgraph:
         elements: list[bg.Element] = [
             bg.EffortSource("S_e", lambda t: 9.81),
@@ -85,6 +101,7 @@ class Examples():
         return bg.DirectedBondgraph("Spring Damper System", elements, bonds)
 
     @staticmethod
+    @register(EXAMPLES)
     def check_transformer() -> bg.DirectedBondgraph:
         elements: list[bg.Element] = [
             bg.EffortSource("S_e", lambda t: 0),
@@ -104,6 +121,7 @@ class Examples():
         return bg.DirectedBondgraph("Transformer Check", elements, bonds)
 
     @staticmethod
+    @register(EXAMPLES)
     def controlled_moving_body() -> bg.DirectedBondgraph:
         elements: list[bg.Element] = [
             bg.Inertance("I", lambda f, p: p - 2 * f, initial_value=5), # Mass = 5
@@ -121,6 +139,7 @@ class Examples():
         return bg.DirectedBondgraph("Simple Moving Body", elements, bonds)
 
     @staticmethod
+    @register(EXAMPLES)
     def electrical_bridge() -> bg.DirectedBondgraph:
         elements: list[bg.Element] = [
             bg.Resistance("R_1", lambda e, f: e - 1 * f),
@@ -165,6 +184,7 @@ class Examples():
         return bg.DirectedBondgraph("Electircal Bridge", elements, bonds)
 
     @staticmethod
+    @register(EXAMPLES)
     def causality_assignment_test():
         elements: list[bg.Element] = [
             bg.EffortSource("S_e", lambda t: 0),
@@ -190,6 +210,7 @@ class Examples():
         return bg.DirectedBondgraph("Causality Assignment", elements, bonds)
 
     @staticmethod
+    @register(EXAMPLES)
     def collision():
         elements: list[bg.Element] = [
             bg.Inertance("I_1", lambda f, p: p - 1 * f, initial_value=3),
@@ -220,9 +241,7 @@ class Examples():
         return bg.DirectedBondgraph("Collision", elements, bonds)
 
 def main(params):
-    methods: dict = {}
-    for (name, method) in inspect.getmembers(Examples, predicate=inspect.isfunction):
-        methods[name] = method
+    methods: dict[str,Callable[[],bg.DirectedBondgraph]] = EXAMPLES
     if len(params) < 4 or params[1] == "help":
         print("Please provide <scenario step_number step_size>")
         print("<scenario> in [")
@@ -239,17 +258,17 @@ def main(params):
                 methods[name]()
             )
     else:
-        bgs.append(methods[sys.argv[1]]())
-    step_number = int(sys.argv[2])
-    step_size = float(sys.argv[3])
+        bgs.append(methods[params[1]]())
+    step_number = int(params[2])
+    step_size = float(params[3])
     for bondgraph in bgs:
-        if "dgraph" in sys.argv:
+        if "dgraph" in params:
             bondgraph.draw_graph()
-        if "deq" in sys.argv:
+        if "deq" in params:
             bondgraph.draw_equations()
-        if "dsol" in sys.argv:
+        if "dsol" in params:
             bondgraph.draw_solution()
-        if "dsim" in sys.argv:
+        if "dsim" in params:
             bondgraph.draw_simulation(
                 start_time = 0.0,
                 step_number = step_number,